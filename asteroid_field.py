@@ -0,0 +1,100 @@
+import numpy as np
+from typing import Tuple
+from model import AsteroidModel, Snapshot, SpaceshipModel
+
+
+class AsteroidField:
+	"""Stores every asteroid in NumPy arrays instead of one AsteroidModel each.
+
+	Drifting, offscreen detection, respawning and collision with the spaceship each run as one vectorized
+	operation, so the cost per tick barely grows with the number of asteroids.
+	"""
+
+	def __init__(self, count: int, game_width: int, game_height: int, rng: "np.random.Generator",
+				 speed: Tuple[int, int] = (4, 6)):
+		"""Inits AsteroidField with count asteroids moving left between speed pixels per tick."""
+		self.game_width = game_width
+		self.game_height = game_height
+		self.rng = rng
+		self.speed = speed
+		self.x = np.empty(0)
+		self.y = np.empty(0)
+		self.r = np.empty(0)
+		self.dx = np.empty(0)
+		self.dy = np.empty(0)
+		self.prev_x = np.empty(0)
+		self.prev_y = np.empty(0)
+		self.add(count)
+
+	def __len__(self) -> int:
+		"""Returns the number of asteroids."""
+		return len(self.x)
+
+	def __getitem__(self, i: int) -> "AsteroidModel":
+		"""Returns an AsteroidModel copy of the asteroid at index i, used by views."""
+		asteroid = AsteroidModel(self.x[i], self.y[i], self.r[i], self.dx[i], self.dy[i])
+		asteroid.prev_x = self.prev_x[i]
+		asteroid.prev_y = self.prev_y[i]
+		return asteroid
+
+	def snapshot(self) -> Tuple["Snapshot", ...]:
+		"""Returns an immutable copy of every asteroid, like GameModel.snapshot does for lists of models."""
+		return tuple(Snapshot(AsteroidModel, *values) for values in zip(
+			self.x.tolist(), self.y.tolist(), self.prev_x.tolist(), self.prev_y.tolist(), self.r.tolist()))
+
+	def save_pos(self):
+		"""Saves the current positions as the positions at the start of the tick."""
+		np.copyto(self.prev_x, self.x)
+		np.copyto(self.prev_y, self.y)
+
+	def add(self, count: int):
+		"""Adds count new asteroids."""
+		start = len(self.x)
+		for name in ("x", "y", "r", "dx", "dy", "prev_x", "prev_y"):
+			setattr(self, name, np.concatenate((getattr(self, name), np.zeros(count))))
+		self.respawn(np.arange(start, start + count))
+
+	def respawn(self, indexes: "np.ndarray"):
+		"""Replaces the asteroids at indexes with new ones to the right of the screen."""
+		count = len(indexes)
+		self.x[indexes] = self.rng.integers(self.game_width, 2 * self.game_width, count, endpoint=True)
+		self.y[indexes] = self.rng.integers(40, self.game_height - 40, count, endpoint=True)
+		self.r[indexes] = self.rng.integers(20, 40, count, endpoint=True)
+		self.dx[indexes] = -self.rng.integers(*self.speed, count, endpoint=True)
+		self.dy[indexes] = 0
+		self.prev_x[indexes] = self.x[indexes]
+		self.prev_y[indexes] = self.y[indexes]
+
+	def drift_all(self) -> "np.ndarray":
+		"""Moves all asteroids by their deltas.
+
+		Returns the indexes of offscreen asteroids.
+		"""
+		self.x += self.dx
+		self.y += self.dy
+		return np.flatnonzero(self.x + self.r < 0)
+
+	def collide(self, spaceship_model: "SpaceshipModel", swept: bool = False) -> int:
+		"""Removes 1 hp from the spaceship for every asteroid touching it and destroys those asteroids.
+
+		Compares squared distances, so no square roots are taken. If swept is set, asteroids that touched the
+		spaceship at any time since the last check count too, like Collidable.swept_touches.
+		Returns the number of asteroids hit.
+		"""
+		reach = self.r + spaceship_model.r
+		if swept:
+			start_x = spaceship_model.prev_x - (self.x - self.dx)
+			start_y = spaceship_model.prev_y - (self.y - self.dy)
+			move_x = spaceship_model.x - spaceship_model.prev_x - self.dx
+			move_y = spaceship_model.y - spaceship_model.prev_y - self.dy
+			length = move_x * move_x + move_y * move_y
+			t = np.divide(-(start_x * move_x + start_y * move_y), length, out=np.zeros(len(self)), where=length > 0)
+			np.clip(t, 0, 1, out=t)
+			hits = (start_x + t * move_x) ** 2 + (start_y + t * move_y) ** 2 < reach * reach
+		else:
+			hits = (self.x - spaceship_model.x) ** 2 + (self.y - spaceship_model.y) ** 2 < reach * reach
+		count = int(np.count_nonzero(hits))
+		if count:
+			spaceship_model.hp -= count
+			self.x[hits] = float("-inf")  # Destroyed asteroids are respawned after drifting, like Driftable.destroy
+		return count
@@ -0,0 +1,156 @@
+"""Runs many seeded games without a display across every core, for tuning difficulty and power-up balance.
+
+Every combination of the swept settings plays the same seeds, so differences between combinations come from
+the settings rather than luck. Each run is written to a CSV file as soon as its chunk finishes, and summary
+statistics of every combination are merged as chunks arrive.
+
+Usage:
+	python batch.py hard --runs 1000 --policy dodge --set base_hp=3,4,5 --set fuel_gain=10,20
+"""
+import argparse
+import csv
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Tuple
+from model import FuelPowerUpModel, HpPowerUpModel, ScorePowerUpModel
+from simulation import DIFFICULTIES, POLICIES, Simulation
+
+DIFFICULTY_SETTINGS = ("num_asteroids", "base_hp", "fuel_consumption")
+POWERUP_EFFECTS = {  # Maps each power-up setting to the class attribute it replaces
+	"hp_gain": (HpPowerUpModel, "hp_gain"),
+	"max_hp": (HpPowerUpModel, "max_hp"),
+	"fuel_gain": (FuelPowerUpModel, "fuel_gain"),
+	"max_fuel": (FuelPowerUpModel, "max_fuel"),
+	"score_gain": (ScorePowerUpModel, "score_gain")}
+DEFAULT_EFFECTS = {name: getattr(powerup_type, attribute) for name, (powerup_type, attribute) in POWERUP_EFFECTS.items()}
+
+
+class RunningStats:
+	"""Count, mean, variance, minimum, and maximum of a stream of values, updated with Welford's algorithm."""
+
+	def __init__(self):
+		"""Inits empty RunningStats."""
+		self.count = 0
+		self.mean = 0.0
+		self.m2 = 0.0  # Sum of squared differences from the mean
+		self.min = float("inf")
+		self.max = float("-inf")
+
+	def add(self, value: float):
+		"""Adds one value."""
+		self.count += 1
+		delta = value - self.mean
+		self.mean += delta / self.count
+		self.m2 += delta * (value - self.mean)
+		self.min = min(self.min, value)
+		self.max = max(self.max, value)
+
+	def merge(self, other: "RunningStats"):
+		"""Adds every value summarized by other, using Chan et al.'s parallel form of Welford's algorithm."""
+		if other.count == 0:
+			return
+		count = self.count + other.count
+		delta = other.mean - self.mean
+		self.mean += delta * other.count / count
+		self.m2 += other.m2 + delta * delta * self.count * other.count / count
+		self.count = count
+		self.min = min(self.min, other.min)
+		self.max = max(self.max, other.max)
+
+	def std(self) -> float:
+		"""Returns the sample standard deviation."""
+		return (self.m2 / (self.count - 1)) ** 0.5 if self.count > 1 else 0.0
+
+
+def apply_effects(settings: Dict[str, float]):
+	"""Sets the power-up effects in settings, and every other effect back to its default.
+
+	Worker processes run chunks with different settings one after another, so no effect may leak between them.
+	"""
+	for name, (powerup_type, attribute) in POWERUP_EFFECTS.items():
+		setattr(powerup_type, attribute, settings.get(name, DEFAULT_EFFECTS[name]))
+
+
+def run_chunk(difficulty: str, settings: Dict[str, float], seeds: range, policy: str,
+			  max_ticks: int) -> Tuple[Dict[str, float], List[dict], Dict[str, "RunningStats"]]:
+	"""Plays one game per seed with some settings.
+
+	Returns the settings, a row per game, and statistics of the scores and ticks of the chunk.
+	"""
+	apply_effects(settings)
+	overrides = {name: value for name, value in settings.items() if name in DIFFICULTY_SETTINGS}
+	rows = []
+	stats = {"score": RunningStats(), "ticks": RunningStats()}
+	for seed in seeds:
+		result = Simulation(difficulty, seed, overrides=overrides).run(POLICIES[policy], max_ticks)
+		rows.append({**settings, "seed": seed, "score": result["score"], "ticks": result["ticks"]})
+		stats["score"].add(result["score"])
+		stats["ticks"].add(result["ticks"])
+	return settings, rows, stats
+
+
+def parse_sweep(assignments: List[str]) -> Dict[str, list]:
+	"""Parses name=value,value,... assignments into the values to try for each setting."""
+	sweep = {}
+	for assignment in assignments:
+		name, values = assignment.split("=", 1)
+		if name not in DIFFICULTY_SETTINGS and name not in POWERUP_EFFECTS:
+			raise ValueError(f"Unknown setting: {name}")
+		sweep[name] = [float(value) if "." in value else int(value) for value in values.split(",")]
+	return sweep
+
+
+def run_batch(difficulty: str, sweep: Dict[str, list], runs: int, first_seed: int, policy: str, max_ticks: int,
+			  path: str, workers: int = None, chunk_size: int = 50) -> Dict[tuple, Dict[str, "RunningStats"]]:
+	"""Plays runs games for every combination of settings in sweep, writing each game to a CSV file at path.
+
+	Returns the statistics of every combination, keyed by its values in the order of sweep.
+	"""
+	names = list(sweep)
+	combinations = [dict(zip(names, values)) for values in itertools.product(*sweep.values())]
+	summaries = {}
+	with ProcessPoolExecutor(workers) as executor, open(path, "w", newline="") as file:
+		writer = csv.DictWriter(file, names + ["seed", "score", "ticks"])
+		writer.writeheader()
+		futures = [executor.submit(run_chunk, difficulty, settings,
+								   range(start, min(start + chunk_size, first_seed + runs)), policy, max_ticks)
+				   for settings in combinations for start in range(first_seed, first_seed + runs, chunk_size)]
+		for future in as_completed(futures):
+			settings, rows, stats = future.result()
+			writer.writerows(rows)
+			file.flush()
+			summary = summaries.setdefault(tuple(settings.values()), {"score": RunningStats(), "ticks": RunningStats()})
+			for column in summary:
+				summary[column].merge(stats[column])
+	return summaries
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Runs many games without a display and summarizes their scores.")
+	parser.add_argument("difficulty", choices=DIFFICULTIES)
+	parser.add_argument("--runs", type=int, default=1000, help="games per combination of settings")
+	parser.add_argument("--seed", type=int, default=0, help="seed of the first game, later games count up from it")
+	parser.add_argument("--policy", choices=POLICIES, default="dodge")
+	parser.add_argument("--max-ticks", type=int, default=100000, help="ends games that would otherwise never end")
+	parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUES",
+						help=f"comma-separated values to sweep, for any of "
+							 f"{', '.join(DIFFICULTY_SETTINGS + tuple(POWERUP_EFFECTS))}")
+	parser.add_argument("--workers", type=int, default=os.cpu_count())
+	parser.add_argument("--chunk-size", type=int, default=50, help="games sent to a worker at a time")
+	parser.add_argument("--output", default="batch.csv")
+	args = parser.parse_args()
+	try:
+		sweep = parse_sweep(args.set)
+	except ValueError as error:
+		parser.error(str(error))
+
+	summaries = run_batch(args.difficulty, sweep, args.runs, args.seed, args.policy, args.max_ticks, args.output,
+						  args.workers, args.chunk_size)
+	print("  ".join(f"{name:>16}" for name in sweep) + "        runs  mean score   std score   min score   "
+																 "max score  mean ticks")
+	for values, summary in sorted(summaries.items()):
+		score, ticks = summary["score"], summary["ticks"]
+		print("  ".join(f"{value:>16}" for value in values) + f"  {score.count:10d}  {score.mean:10.0f}  "
+															  f"{score.std():10.0f}  {score.min:10.0f}  "
+															  f"{score.max:10.0f}  {ticks.mean:10.0f}")
@@ -0,0 +1,453 @@
+"""Benchmarks for Gus' Space Adventure.
+
+Usage:
+	python benchmark.py render [frames] [asteroids]
+	python benchmark.py startup [runs]
+	python benchmark.py memory [ticks]
+	python benchmark.py stress [model|vectorized|render] [fps]
+	python benchmark.py suite [results.json] [baseline.json]
+	python benchmark.py tunneling [ticks]
+
+The suite times the model and view hot paths without a display and saves the results as JSON. Given a
+baseline from an earlier run, it flags every benchmark that got more than REGRESSION_THRESHOLD slower and
+exits with status 1 if any did.
+"""
+import datetime as dt
+import json
+import platform
+import subprocess
+import sys
+import timeit
+import tracemalloc
+from random import randint
+from statistics import mean, quantiles
+from time import perf_counter
+from typing import Callable, Dict, List, Set
+import memory_firestore
+from model import *
+from view import *
+from simulation import Simulation, random_policy
+from storage import FirestoreBackend
+
+SUITE_COUNTS = (10, 100, 1000)  # Numbers of entities each parameterized benchmark runs with
+REGRESSION_THRESHOLD = 0.2  # Fraction slower than the baseline that counts as a regression
+
+
+def build_scene(view: "GameView", num_asteroids: int) -> "GameModel":
+	"""Creates a game model and matching views with a number of asteroids."""
+	model = GameModel()
+	model["spaceship"] = SpaceshipModel(150, 400, 40, 5, 100)
+	view["spaceship"] = SpaceshipView(view.screen)
+	model["asteroids"] = [AsteroidModel(randint(0, view.game_width), randint(40, view.game_height - 40), randint(20, 40),
+										-randint(4, 6), 0) for i in range(num_asteroids)]
+	view["asteroids"] = [AsteroidView(view.screen) for i in range(num_asteroids)]
+	model["stats"] = model["spaceship"]
+	view["stats"] = SpaceshipStatsView(view.screen)
+	model["powerup"] = FuelPowerUpModel(view.game_width, 400, 36, -5, 0)
+	view["powerup"] = FuelPowerUpView(view.screen)
+	return model
+
+
+def time_frames(view: "GameView", model: "GameModel", frames: int, retained: bool) -> List[float]:
+	"""Times drawing frames, either moving retained canvas items or recreating them every frame."""
+	frame_times = []
+	for i in range(frames):
+		start = perf_counter()
+		Driftable.drift_all(model["asteroids"] + [model["powerup"]])
+		for asteroid in model["asteroids"]:
+			if asteroid.x + asteroid.r < 0:
+				asteroid.x = view.game_width + asteroid.r  # Wraps asteroids around instead of respawning them
+		if model["powerup"].x + model["powerup"].r < 0:
+			model["powerup"].x = view.game_width
+		model["spaceship"].score += 10
+		view.draw_all(model)
+		view.update()
+		if not retained:
+			view.delete_all()
+		frame_times.append(perf_counter() - start)
+	view.delete_all()
+	return frame_times
+
+
+def report(name: str, frame_times: List[float]):
+	"""Prints mean and percentile frame times in milliseconds."""
+	p50, p95, p99 = (quantiles(frame_times, n=100)[i] * 1000 for i in (49, 94, 98))
+	print(f"{name:<10} mean {mean(frame_times) * 1000:7.3f} ms  p50 {p50:7.3f} ms  p95 {p95:7.3f} ms  p99 {p99:7.3f} ms")
+
+
+def benchmark_render(frames: int = 500, num_asteroids: int = 20):
+	"""Compares frame times of the retained and delete-and-recreate rendering paths."""
+	view = GameView()
+	model = build_scene(view, num_asteroids)
+	print(f"Rendering {frames} frames with {num_asteroids} asteroids")
+	report("recreate", time_frames(view, model, frames, retained=False))
+	report("retained", time_frames(view, model, frames, retained=True))
+	view.root.destroy()
+
+
+STARTUP_SCRIPT = """
+from time import perf_counter
+start = perf_counter()
+from main import Game
+from settings import load_settings
+settings = load_settings()
+settings["startup"]["lazy_resources"] = {lazy}
+game = Game(settings)
+game.bind_events()
+game.view.menu.draw_username_input(game.view.root)
+game.view.root.update()
+print(perf_counter() - start)
+game.view.root.destroy()
+"""
+
+
+def benchmark_startup(runs: int = 5):
+	"""Compares time from the first import to the first interactive frame with eager and lazy startup.
+
+	Each run starts a fresh interpreter so nothing is already imported or loaded.
+	"""
+	for lazy in (False, True):
+		times = []
+		for i in range(runs):
+			output = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT.format(lazy=lazy)], capture_output=True,
+									text=True, check=True).stdout
+			times.append(float(output.split()[-1]))
+		print(f"{'lazy' if lazy else 'eager':<6} first frame after mean {mean(times) * 1000:7.1f} ms  "
+			  f"min {min(times) * 1000:7.1f} ms")
+
+
+def immortal_policy(simulation: "Simulation") -> Set[str]:
+	"""Restores the spaceship's hp and presses random keys, so benchmarked games never end."""
+	simulation.model["spaceship"].hp = 9
+	return random_policy(simulation)
+
+
+def benchmark_memory(ticks: int = 100000):
+	"""Compares Driftable allocations and traced memory of one long run with and without pooling.
+
+	The spaceship's hp is topped up every tick so it survives the whole run.
+	"""
+	for pooling in (False, True):
+		tracemalloc.start()
+		simulation = Simulation("hard", 0, pooling=pooling)
+		result = simulation.run(immortal_policy, ticks)
+		current, peak = tracemalloc.get_traced_memory()
+		tracemalloc.stop()
+		print(f"{'pooled' if pooling else 'unpooled':<9} {result['ticks']} ticks  "
+			  f"{simulation.pool.allocations} Driftables allocated  peak traced {peak / 1024:.0f} KiB  "
+			  f"{result['seconds']:.2f} s")
+
+
+def time_ticks(pipeline: str, num_asteroids: int, ticks: int) -> List[float]:
+	"""Times ticks of an endless game with a number of asteroids, including drawing them for the render pipeline."""
+	simulation = Simulation("endless", 0, num_asteroids=num_asteroids, vectorized=pipeline == "vectorized")
+	simulation.ramp = None  # Keeps the number of asteroids fixed
+	view = None
+	if pipeline == "render":
+		view = GameView()
+		view["spaceship"] = SpaceshipView(view.screen)
+		view["asteroids"] = [AsteroidView(view.screen) for i in range(num_asteroids)]
+		view["stats"] = SpaceshipStatsView(view.screen)
+		view["powerup"] = FuelPowerUpView(view.screen)
+	tick_times = []
+	for i in range(ticks):
+		start = perf_counter()
+		simulation.step(immortal_policy(simulation))
+		if view is not None:
+			view.draw_all(simulation.model.snapshot())
+			view.update()
+		tick_times.append(perf_counter() - start)
+	if view is not None:
+		view.root.destroy()
+	return tick_times
+
+
+def benchmark_stress(pipeline: str = "model", fps: int = 50, ticks: int = 200):
+	"""Doubles the number of asteroids until the p95 tick time no longer fits in a frame at fps.
+
+	The model and vectorized pipelines only run the simulation, so they need no display; render also draws.
+	"""
+	budget = 1 / fps
+	num_asteroids = 25
+	print(f"Stressing the {pipeline} pipeline against a {budget * 1000:.1f} ms budget ({fps} fps)")
+	while num_asteroids <= 102400:
+		tick_times = time_ticks(pipeline, num_asteroids, ticks)
+		p95 = quantiles(tick_times, n=100)[94]
+		report(str(num_asteroids), tick_times)
+		if p95 > budget:
+			print(f"Breaking point: {num_asteroids} asteroids")
+			return
+		num_asteroids *= 2
+	print(f"No breaking point up to {num_asteroids // 2} asteroids")
+
+
+class VirtualImage:
+	"""Stand-in for a Tkinter PhotoImage, which cannot be created without a display."""
+
+	def __init__(self, width: int = 228, height: int = 72):
+		"""Inits VirtualImage with the size of a menu button."""
+		self.size = (width, height)
+
+	def width(self) -> int:
+		"""Returns the width of the image."""
+		return self.size[0]
+
+	def height(self) -> int:
+		"""Returns the height of the image."""
+		return self.size[1]
+
+
+class VirtualCanvas:
+	"""Stand-in for a Tkinter Canvas that keeps its items in a dict instead of drawing them.
+
+	It supports the subset of the Canvas interface used by the views, so their own cost can be timed
+	without a display.
+	"""
+
+	def __init__(self, width: int = 800, height: int = 900):
+		"""Inits an empty VirtualCanvas."""
+		self.options = {"width": width, "height": height}
+		self.items = {}  # Maps item ids to their type, coordinates, options, and tags
+		self.next_id = 1
+
+	def __getitem__(self, option: str):
+		"""Returns an option of the canvas, such as its width."""
+		return self.options[option]
+
+	def __getattr__(self, name: str):
+		"""Returns a create_ method for every item type."""
+		if name.startswith("create_"):
+			return lambda *coords, **options: self.create(name[len("create_"):], coords, options)
+		raise AttributeError(name)
+
+	def create(self, item_type: str, coords: tuple, options: dict) -> int:
+		"""Stores a new item and returns its id."""
+		item_id = self.next_id
+		self.next_id += 1
+		tags = options.pop("tags", ())
+		self.items[item_id] = [item_type, coords, options, {tags} if isinstance(tags, str) else set(tags)]
+		return item_id
+
+	def find(self, tag_or_id) -> List[int]:
+		"""Returns the ids of the items matching an id, a tag, "all", or "!tag"."""
+		if isinstance(tag_or_id, int):
+			return [tag_or_id] if tag_or_id in self.items else []
+		if tag_or_id == "all":
+			return list(self.items)
+		if tag_or_id.startswith("!"):
+			return [item_id for item_id, item in self.items.items() if tag_or_id[1:] not in item[3]]
+		return [item_id for item_id, item in self.items.items() if tag_or_id in item[3]]
+
+	def coords(self, item_id: int, *coords):
+		"""Sets the coordinates of an item."""
+		self.items[item_id][1] = coords
+
+	def move(self, tag_or_id, dx: float, dy: float):
+		"""Moves items by dx, dy."""
+		for item_id in self.find(tag_or_id):
+			item = self.items[item_id]
+			item[1] = tuple(c + (dy if i % 2 else dx) for i, c in enumerate(item[1]))
+
+	def itemconfig(self, tag_or_id, **options):
+		"""Changes options of items."""
+		for item_id in self.find(tag_or_id):
+			self.items[item_id][2].update(options)
+
+	itemconfigure = itemconfig
+
+	def delete(self, *tags_or_ids):
+		"""Deletes items."""
+		for tag_or_id in tags_or_ids:
+			for item_id in self.find(tag_or_id):
+				del self.items[item_id]
+
+	def tag_bind(self, *args):
+		"""Ignores event bindings."""
+		pass
+
+	def update(self):
+		"""Does nothing, since there is nothing to draw."""
+		pass
+
+
+def virtual_view() -> "GameView":
+	"""Creates a GameView on a VirtualCanvas, filling in stand-ins for every image."""
+	for file_name in listdir(GameView.resources.directory):
+		GameView.resources.setdefault(file_name, VirtualImage())
+	for sprite in SpriteAtlas.sprites:
+		GameView.sprites.setdefault(sprite, VirtualImage(80, 80))
+	return GameView(screen=VirtualCanvas())
+
+
+def suite_cases() -> Dict[str, Callable[[], None]]:
+	"""Returns every benchmark in the suite, keyed by name, as a function running one iteration."""
+	cases = {}
+	for count in SUITE_COUNTS:
+		asteroids = [AsteroidModel(randint(0, 800), randint(40, 760), randint(20, 40), -randint(4, 6), 0)
+					 for i in range(count)]
+		cases[f"drift_all/{count}"] = lambda asteroids=asteroids: Driftable.drift_all(asteroids)
+
+		spaceship = SpaceshipModel(150, 400, 40, 5, 100)
+		misses = [AsteroidModel(600, randint(40, 760), randint(20, 40), -5, 0) for i in range(count)]
+
+		def collided(spaceship=spaceship, asteroids=misses):
+			"""Checks the spaceship against asteroids that are out of reach."""
+			for asteroid in asteroids:
+				spaceship.collided(asteroid)
+
+		cases[f"collided/{count}"] = collided
+
+		mover = SpaceshipModel(400, 400, 40, 5, 100)
+		keys = [{"w", "d"}, {"s", "a"}] * (count // 2)
+
+		def move(spaceship=mover, keys=keys):
+			"""Moves the spaceship back and forth without using fuel."""
+			for keys_pressed in keys:
+				spaceship.move(keys_pressed, 800, 800, 0)
+
+		cases[f"move/{count}"] = move
+
+		cases[f"leaderboard_update/{count}"] = leaderboard_update_case(count)
+
+		view = virtual_view()
+		model = GameModel()
+		model["spaceship"] = SpaceshipModel(150, 400, 40, 5, 100)
+		model["asteroids"] = [AsteroidModel(randint(0, 800), randint(40, 760), randint(20, 40), -5, 0)
+							  for i in range(count)]
+		model["stats"] = model["spaceship"]
+		model["powerup"] = FuelPowerUpModel(800, 400, 36, -5, 0)
+		view["spaceship"] = SpaceshipView(view.screen)
+		view["asteroids"] = [AsteroidView(view.screen) for i in range(count)]
+		view["stats"] = SpaceshipStatsView(view.screen)
+		view["powerup"] = FuelPowerUpView(view.screen)
+		view.draw_all(model)
+
+		def draw_all(view=view, model=model):
+			"""Moves every retained canvas item."""
+			model["spaceship"].score += 10
+			view.draw_all(model, 0.5)
+
+		def delete_all(view=view, model=model):
+			"""Deletes and recreates every canvas item."""
+			view.delete_all()
+			view.draw_all(model, 0.5)
+
+		cases[f"draw_all/{count}"] = draw_all
+		cases[f"delete_all/{count}"] = delete_all
+
+	menu = virtual_view().menu
+	scores = [{"username": f"player{i}", "score": 1000 * (10 - i), "timestamp": dt.datetime(2022, 1, 1)}
+			  for i in range(10)]
+
+	def menu_transitions(menu=menu, scores=scores):
+		"""Visits every menu screen once."""
+		for name in SCREENS:
+			menu.draw_screen(name)
+			if name.endswith(" leaderboard"):
+				menu.draw_scores(scores)
+		menu.draw_game_over(1000)
+		menu.button_at(400, 400)
+
+	cases["menu_transitions"] = menu_transitions
+	return cases
+
+
+def leaderboard_update_case(size: int) -> Callable[[], None]:
+	"""Returns a benchmark inserting high scores into leaderboards of a size kept in memory_firestore.
+
+	The backend is timed directly rather than through LeaderboardModel.update, whose unsubscribed cache starts
+	a background refresh after every insert that would read and parse the whole document during the timing.
+	"""
+	timestamp = "2022/01/01 00:00:00.000000"
+	db = memory_firestore.Client({"gsa/leaderboard": {
+		difficulty: [{"username": f"player{i}", "score": 1000 * (size - i), "timestamp": timestamp} for i in range(size)]
+		for difficulty in ("easy", "medium", "hard")}})
+	backend = FirestoreBackend(db=db, transactional=memory_firestore.transactional)
+	scores = iter(range(1000 * size + 1, sys.maxsize))  # Every score beats the last, so each one is inserted
+
+	def leaderboard_update():
+		"""Inserts one high score into the easy leaderboard in a transaction."""
+		backend.insert("easy", {"username": "benchmark", "score": next(scores), "timestamp": timestamp})
+
+	return leaderboard_update
+
+
+def time_case(case: Callable[[], None], repeats: int = 5) -> float:
+	"""Returns the fastest of several timings of one iteration of a benchmark, in seconds."""
+	timer = timeit.Timer(case)
+	number, elapsed = timer.autorange()
+	return min([elapsed] + timer.repeat(repeats - 1, number)) / number
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float]) -> List[str]:
+	"""Prints how each benchmark changed from the baseline and returns the names of those that regressed."""
+	regressions = []
+	for name, seconds in results.items():
+		if name not in baseline:
+			continue
+		change = seconds / baseline[name] - 1
+		regressed = change > REGRESSION_THRESHOLD
+		if regressed:
+			regressions.append(name)
+		print(f"{name:<26} {change * 100:+7.1f}%{'  REGRESSION' if regressed else ''}")
+	return regressions
+
+
+def benchmark_suite(path: str = "benchmark.json", baseline_path: str = None):
+	"""Runs every benchmark in the suite, saves the results to path, and compares them with a baseline."""
+	results = {}
+	for name, case in suite_cases().items():
+		results[name] = time_case(case)
+		print(f"{name:<26} {results[name] * 1e6:12.2f} us")
+	with open(path, "w") as file:
+		json.dump({"python": platform.python_version(), "time": dt.datetime.now().isoformat(), "results": results},
+				  file, indent=1)
+	if baseline_path is not None:
+		with open(baseline_path) as file:
+			baseline = json.load(file)["results"]
+		print(f"Compared with {baseline_path}")
+		if compare(results, baseline):
+			sys.exit(1)
+
+
+class HitCountingSimulation(Simulation):
+	"""Simulation that counts the hits both the discrete and the swept collision check find every tick.
+
+	Every asteroid is checked, not only nearby ones, so the counts do not depend on the broad phase.
+	"""
+
+	def __init__(self, *args, **kwargs):
+		"""Inits HitCountingSimulation."""
+		self.hits = {"discrete": 0, "swept": 0, "missed": 0}  # Missed hits are found only by the swept check
+		super().__init__(*args, **kwargs)
+
+	def collide(self):
+		"""Counts hits, then collides like Simulation."""
+		spaceship = self.model["spaceship"]
+		for other in self.model["asteroids"] + [self.model["powerup"]]:
+			discrete, swept = spaceship.touches(other), spaceship.swept_touches(other)
+			self.hits["discrete"] += discrete
+			self.hits["swept"] += swept
+			self.hits["missed"] += swept and not discrete
+		super().collide()
+
+
+def benchmark_tunneling(ticks: int = 20000):
+	"""Measures how many hits the discrete collision check misses as Driftables get faster than in the game."""
+	print(f"Hits over {ticks} ticks of hard with the swept check, by Driftable speed")
+	for scale in (1, 2, 4, 8, 16):
+		speed = (4 * scale, 6 * scale)
+		simulation = HitCountingSimulation("hard", 0, overrides={"speed": speed}, swept=True)
+		simulation.run(immortal_policy, ticks)
+		hits = simulation.hits
+		print(f"speed {speed[0]:>3}-{speed[1]:<3} discrete {hits['discrete']:6d}  swept {hits['swept']:6d}  "
+			  f"missed by discrete {hits['missed']:6d} ({hits['missed'] / max(1, hits['swept']) * 100:5.1f}%)")
+
+
+if __name__ == "__main__":
+	benchmarks = {"render": benchmark_render, "startup": benchmark_startup, "memory": benchmark_memory,
+				  "stress": benchmark_stress, "suite": benchmark_suite, "tunneling": benchmark_tunneling}
+	if len(sys.argv) < 2 or sys.argv[1] not in benchmarks:
+		print(__doc__)
+		sys.exit(1)
+	benchmarks[sys.argv[1]](*(int(arg) if arg.isdigit() else arg for arg in sys.argv[2:]))
@@ -0,0 +1,168 @@
+"""Imports scores into and exports scores from the leaderboard backend in bulk, without playing the game.
+
+Files are JSON lines or CSV, chosen by their extension, with a difficulty, username, score, and timestamp per
+score. Timestamps are in the leaderboard's format, YYYY/MM/DD HH:MM:SS.MMMMMM, or ISO 8601.
+Files are streamed rather than loaded: an import reads its file once to check every score before writing
+anything, then once per difficulty, handing that difficulty's scores to the backend in one bulk write.
+
+Usage:
+	python leaderboard_tool.py import scores.jsonl
+	python leaderboard_tool.py export scores.csv --difficulty hard
+"""
+import argparse
+import csv
+import datetime as dt
+import json
+import sys
+from typing import Iterator, List, Tuple
+from settings import load_settings
+from simulation import DIFFICULTIES
+from storage import TIMESTAMP_FORMAT, create_backend
+
+COLUMNS = ("difficulty", "username", "score", "timestamp")
+FORMATS = ("jsonl", "csv")
+LEADERBOARD_DIFFICULTIES = tuple(difficulty for difficulty, settings in DIFFICULTIES.items() if settings["leaderboard"])
+
+
+def file_format(path: str, format_name: str = None) -> str:
+	"""Returns format_name, or the format named by the extension of path."""
+	format_name = format_name or path.rsplit(".", 1)[-1].lower()
+	if format_name not in FORMATS:
+		raise ValueError(f"Unknown format of {path}, name one with --format")
+	return format_name
+
+
+def read_records(path: str, format_name: str) -> Iterator[Tuple[int, dict]]:
+	"""Yields the line number and fields of every record in a file, one at a time."""
+	with open(path, newline="") as file:
+		if format_name == "csv":
+			reader = csv.DictReader(file)
+			for record in reader:
+				yield reader.line_num, record
+		else:
+			for line_number, line in enumerate(file, 1):
+				if line.strip():
+					try:
+						yield line_number, json.loads(line)
+					except json.JSONDecodeError as error:
+						raise ValueError(f"{path}:{line_number}: {error}")
+
+
+def parse_timestamp(timestamp: str) -> str:
+	"""Returns a timestamp in the leaderboard's format, converting it from ISO 8601 if needed."""
+	try:
+		return dt.datetime.strptime(timestamp, TIMESTAMP_FORMAT).strftime(TIMESTAMP_FORMAT)
+	except ValueError:
+		return dt.datetime.fromisoformat(timestamp).strftime(TIMESTAMP_FORMAT)
+
+
+def parse_record(record: dict) -> Tuple[str, dict]:
+	"""Returns the difficulty and leaderboard entry of a record, raising ValueError if it is invalid."""
+	missing = [column for column in COLUMNS if record.get(column) in (None, "")]
+	if missing:
+		raise ValueError(f"missing {', '.join(missing)}")
+	if record["difficulty"] not in LEADERBOARD_DIFFICULTIES:
+		raise ValueError(f"no leaderboard for difficulty {record['difficulty']}")
+	username = str(record["username"])
+	if len(username) > 12:
+		raise ValueError(f"username {username} is longer than 12 characters")
+	score = int(record["score"])
+	if score < 0:
+		raise ValueError(f"negative score {score}")
+	return record["difficulty"], {"username": username, "score": score,
+								  "timestamp": parse_timestamp(str(record["timestamp"]))}
+
+
+def read_entries(path: str, format_name: str, difficulty: str) -> Iterator[dict]:
+	"""Yields the entries of one difficulty in a file."""
+	for line_number, record in read_records(path, format_name):
+		record_difficulty, entry = parse_record(record)
+		if record_difficulty == difficulty:
+			yield entry
+
+
+def check_file(path: str, format_name: str) -> dict:
+	"""Checks every record in a file and returns the number of scores of each difficulty.
+
+	Raises ValueError naming the line of the first invalid record.
+	"""
+	counts = dict.fromkeys(LEADERBOARD_DIFFICULTIES, 0)
+	for line_number, record in read_records(path, format_name):
+		try:
+			difficulty, entry = parse_record(record)
+		except (ValueError, TypeError, AttributeError) as error:
+			raise ValueError(f"{path}:{line_number}: {error}")
+		counts[difficulty] += 1
+	return counts
+
+
+def import_scores(backend: "LeaderboardBackend", path: str, format_name: str,
+				  difficulties: List[str]) -> List[Tuple[str, int, int]]:
+	"""Stores every score in a file with one bulk write per difficulty.
+
+	Returns the difficulty, number of scores read, and number stored of every difficulty with scores.
+	"""
+	counts = check_file(path, format_name)
+	results = []
+	for difficulty in difficulties:
+		if counts[difficulty]:
+			stored = backend.bulk_insert(difficulty, read_entries(path, format_name, difficulty))
+			results.append((difficulty, counts[difficulty], stored))
+	return results
+
+
+def iterate_scores(backend: "LeaderboardBackend", difficulty: str, page_size: int = 500) -> Iterator[dict]:
+	"""Yields every stored score of a difficulty in leaderboard order, a page at a time."""
+	entries = backend.read()[difficulty]
+	while entries:
+		yield from entries
+		entries = backend.page(difficulty, entries[-1], page_size)
+
+
+def export_scores(backend: "LeaderboardBackend", path: str, format_name: str, difficulties: List[str]) -> int:
+	"""Writes every stored score of some difficulties to a file and returns how many were written."""
+	written = 0
+	with open(path, "w", newline="") as file:
+		writer = csv.DictWriter(file, COLUMNS) if format_name == "csv" else None
+		if writer is not None:
+			writer.writeheader()
+		for difficulty in difficulties:
+			for entry in iterate_scores(backend, difficulty):
+				record = {"difficulty": difficulty, **entry}
+				if writer is None:
+					file.write(json.dumps(record) + "\n")
+				else:
+					writer.writerow(record)
+				written += 1
+	return written
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Imports or exports leaderboard scores in bulk.")
+	parser.add_argument("command", choices=("import", "export"))
+	parser.add_argument("path", help="JSON lines (.jsonl) or CSV (.csv) file")
+	parser.add_argument("--format", choices=FORMATS, help="format of the file, instead of its extension")
+	parser.add_argument("--difficulty", action="append", choices=LEADERBOARD_DIFFICULTIES,
+						help="only imports or exports this difficulty, can be given more than once")
+	parser.add_argument("--backend", choices=("firestore", "firestore_scores", "sqlite"),
+						help="backend to use instead of the one in the settings")
+	args = parser.parse_args()
+	try:
+		format_name = file_format(args.path, args.format)
+	except ValueError as error:
+		parser.error(str(error))
+
+	leaderboard_settings = load_settings()["leaderboard"]
+	if args.backend is not None:
+		leaderboard_settings["backend"] = args.backend
+	backend = create_backend(leaderboard_settings)
+	difficulties = args.difficulty or list(LEADERBOARD_DIFFICULTIES)
+	if args.command == "import":
+		try:
+			results = import_scores(backend, args.path, format_name, difficulties)
+		except ValueError as error:
+			sys.exit(f"Nothing imported: {error}")
+		for difficulty, read, stored in results:
+			print(f"{difficulty}: {read} scores read, {stored} stored")
+	else:
+		print(f"{export_scores(backend, args.path, format_name, difficulties)} scores exported")
@@ -1,8 +1,18 @@
 from model import *
 from view import *
+import datetime as dt
+import os
+import queue
+import random
 from tkinter import EventType
-from time import sleep
-from random import randint, choice
+from functools import partial
+from scheduler import FixedStepScheduler, ThreadedScheduler
+from simulation import DIFFICULTIES, Simulation
+from replay import SWEPT_COLLISIONS, Recording, keys_to_mask, mask_to_keys
+from profiler import FrameProfiler, NullProfiler
+from submission import ScoreSubmitter
+from settings import load_settings
+from storage import create_backend
 
 
 class Game:
@@ -11,96 +21,163 @@ class Game:
 	Handles inputs and passes it to the model.
 	"""
 
-	def __init__(self):
-		"""Inits Game."""
+	def __init__(self, settings: dict = None):
+		"""Inits Game with settings, loaded from config/settings.json by default."""
+		self.settings = settings or load_settings()
 		self.model = GameModel()
-		self.view = GameView()
-		self.leaderboard = LeaderboardModel()
-
-		self.frame_rate = 0.02
+		self.view = GameView(self.settings["startup"]["lazy_resources"])
+		self.leaderboard = LeaderboardModel(partial(create_backend, self.settings["leaderboard"]),
+											self.settings["leaderboard"]["ttl"], self.settings["leaderboard"]["subscribe"])
+		self.submitter = ScoreSubmitter(self.leaderboard)
+
+		self.frame_rate = 0.02  # Seconds per simulation tick
+		self.render_rate = 1 / 60  # Seconds per rendered frame
+		self.leaderboard_poll_rate = 0.25  # Seconds between checks for leaderboard changes to draw
+		self.scheduler = None
 		self.keys_pressed = set()
-		self.fuel_consumption = None
-
-	def generate_asteroid_model(self):
-		"""Generates a new AsteroidModel."""
-		return AsteroidModel(randint(self.view.game_width, 2 * self.view.game_width),
-							 randint(40, self.view.game_height - 40), randint(20, 40), -randint(4, 6), 0)
-
-	def generate_powerup(self):
-		"""Generates a new PowerUpModel and a corresponding PowerUpView."""
-		if self.model["spaceship"].fuel < 40:
-			return (
-			FuelPowerUpModel(self.view.game_width + 100, randint(36, self.view.game_height - 36), 36, -randint(4, 6),
-							 0), FuelPowerUpView(self.view.screen))
-
-		powerups = [(HpPowerUpModel(self.view.screen_width + 100, randint(36, self.view.game_height - 36), 36,
-									-randint(4, 6), 0), HpPowerUpView(self.view.screen)), (
-					FuelPowerUpModel(self.view.game_width + 100, randint(36, self.view.game_height - 36), 36,
-									 -randint(4, 6), 0), FuelPowerUpView(self.view.screen)), (
-					ScorePowerUpModel(self.view.game_width + 100, randint(36, self.view.game_height - 36), 36,
-									  -randint(4, 6), 0), ScorePowerUpView(self.view.screen))]
-		return choice(powerups)
+		self.key_mask = 0  # Bitmask of keys_pressed, replaced whole so the simulation thread can read it at any time
+		self.simulation = None
+		self.snapshot = None  # Latest immutable copy of the model, the only part of it views draw
+		self.recording = None
+		self.view_pool = None
+		self.profiler = FrameProfiler() if self.settings["profiler"]["enabled"] else NullProfiler()
+		self.profiler_view = None
+		self.actions = {
+			"menu": self.view.menu.draw_menu,
+			"levels": self.view.menu.draw_levels,
+			"instructions": self.view.menu.draw_instructions,
+			"leaderboard": self.view.menu.draw_leaderboard,
+			"quit": self.view.root.destroy,
+			"start easy": partial(self.start, "easy"),
+			"start medium": partial(self.start, "medium"),
+			"start hard": partial(self.start, "hard"),
+			"start endless": partial(self.start, "endless"),
+			"easy leaderboard": partial(self.view.menu.draw_easy_leaderboard, self.leaderboard),
+			"medium leaderboard": partial(self.view.menu.draw_medium_leaderboard, self.leaderboard),
+			"hard leaderboard": partial(self.view.menu.draw_hard_leaderboard, self.leaderboard),
+			"previous page": partial(self.view.menu.draw_previous_page, self.leaderboard),
+			"next page": partial(self.view.menu.draw_next_page, self.leaderboard),
+		}  # Actions of menu buttons by name
+		self.powerup_views = {HpPowerUpModel: HpPowerUpView, FuelPowerUpModel: FuelPowerUpView,
+							  ScorePowerUpModel: ScorePowerUpView}
+
+	def generate_powerup_view(self, powerup_type: type) -> "ObjectView":
+		"""Generates the PowerUpView that corresponds to a type of PowerUpModel."""
+		return self.view_pool.acquire(self.powerup_views[powerup_type])
 
 	def set_initial_values(self, difficulty: str):
 		"""Initializes models and views."""
-		if difficulty == "easy":
-			num_asteroids = 10
-			base_hp = 5
-			self.fuel_consumption = 0.2
-		elif difficulty == "medium":
-			num_asteroids = 15
-			base_hp = 4
-			self.fuel_consumption = 0.2
-		elif difficulty == "hard":
-			num_asteroids = 20
-			base_hp = 3
-			self.fuel_consumption = 0.25
-
-		self.model["spaceship"] = SpaceshipModel(150, 400, 40, base_hp, 100)
+		seed = random.getrandbits(64)
+		swept = self.settings["simulation"]["swept_collisions"]
+		self.simulation = Simulation(difficulty, seed, self.view.game_width, self.view.game_height,
+									 profiler=self.profiler, swept=swept)
+		self.recording = Recording(difficulty, seed, SWEPT_COLLISIONS if swept else 0)
+		self.model = self.simulation.model
+		self.snapshot = self.model.snapshot()
+		self.view_pool = ViewPool(self.view.screen)
 		self.view["spaceship"] = SpaceshipView(self.view.screen)
-		self.model["asteroids"] = [self.generate_asteroid_model() for i in range(num_asteroids)]
-		self.view["asteroids"] = [AsteroidView(self.view.screen) for i in range(num_asteroids)]
-		self.model["stats"] = self.model["spaceship"]
+		self.view["asteroids"] = [AsteroidView(self.view.screen) for i in range(len(self.snapshot["asteroids"]))]
 		self.view["stats"] = SpaceshipStatsView(self.view.screen)
-		self.model["powerup"], self.view["powerup"] = self.generate_powerup()
+		self.view["powerup"] = self.generate_powerup_view(self.snapshot["powerup"].type)
+		if self.settings["profiler"]["enabled"] and self.settings["profiler"]["overlay"]:
+			self.profiler_view = ProfilerView(self.view.screen)
 
 	def run(self):
 		"""Binds events and shows username input screen."""
 		self.bind_events()
 		self.view.menu.draw_username_input(self.view.root)
+		self.poll_leaderboard()
 		self.view.screen.mainloop()
+		if self.settings["profiler"]["enabled"]:
+			self.profiler.dump(self.settings["profiler"]["trace"])
 
 	def start(self, difficulty: str):
-		"""Runs all game functions."""
+		"""Starts the game loop, which runs until the spaceship is destroyed or q is pressed.
+
+		The simulation steps on its own thread unless the threaded simulation setting is off.
+		"""
 		self.view.menu.clear()
 		self.set_initial_values(difficulty)
-
-		while self.model["spaceship"].hp > 0 and "q" not in self.keys_pressed:
-			if self.model["spaceship"].fuel > 0:
-				self.model["spaceship"].move(self.keys_pressed, self.view.game_width, self.view.game_height,
-											 self.fuel_consumption)
-
-			for asteroid in self.model["asteroids"]:
-				self.model["spaceship"].collided(asteroid)
-			self.model["spaceship"].collided(self.model["powerup"])
-
-			offscreen_asteroids = Driftable.drift_all(self.model["asteroids"])
-			for i in offscreen_asteroids:
-				self.model["asteroids"][i] = self.generate_asteroid_model()
-			if Driftable.drift_all([self.model["powerup"]]):
-				self.model["powerup"], self.view["powerup"] = self.generate_powerup()
-			self.view.draw_all(self.model)
-			self.view.update()
-			sleep(self.frame_rate)
-			self.view.delete_all()
-			self.model["spaceship"].score += 10
-
-		self.end_game(difficulty)
+		scheduler_type = ThreadedScheduler if self.settings["simulation"]["threaded"] else FixedStepScheduler
+		self.scheduler = scheduler_type(self.view.root, self.step, self.render, lambda: self.end_game(difficulty),
+										self.frame_rate, self.render_rate)
+		self.scheduler.start()
+
+	def step(self) -> bool:
+		"""Runs all game functions for one tick and publishes a snapshot of the model for render.
+
+		Returns False once the game is over.
+		"""
+		keys_pressed = mask_to_keys(self.key_mask)  # Reads the keys once, so the tick and recording agree
+		self.recording.record(keys_pressed)
+		if not self.simulation.step(keys_pressed):
+			return False
+		self.snapshot = self.model.snapshot()
+		return True
+
+	def render(self, alpha: float):
+		"""Draws the latest snapshot, interpolated a fraction alpha of the way through its tick."""
+		self.profiler.start()
+		snapshot = self.snapshot
+		while len(self.view["asteroids"]) < len(snapshot["asteroids"]):
+			self.view["asteroids"].append(AsteroidView(self.view.screen))  # Difficulty ramps add asteroids
+		if self.powerup_views[snapshot["powerup"].type] is not type(self.view["powerup"]):
+			self.view_pool.release(self.view["powerup"])
+			self.view["powerup"] = self.generate_powerup_view(snapshot["powerup"].type)
+		self.view.draw_all(snapshot, alpha)
+		if self.profiler_view is not None:
+			self.profiler_view.draw(self.profiler)
+		self.profiler.lap("draw")
+		self.profiler.count_operations(self.view.screen.pop_operations())
+		self.profiler.end_frame()
+
+	def poll_leaderboard(self):
+		"""Patches the leaderboard screen shown with changed rows and personal bests, then checks again later.
+
+		Changes arrive on the backend's threads, so they are queued and drawn here on the Tkinter thread.
+		"""
+		while True:
+			try:
+				difficulty, rows = self.leaderboard.changes.get_nowait()
+			except queue.Empty:
+				break
+			if self.view.menu.current_display != f"{difficulty} leaderboard":
+				continue
+			if self.view.menu.page_entries or self.view.menu.first_rank != 1:
+				self.view.menu.patch_scores(self.leaderboard.get(difficulty), rows)
+			else:
+				self.view.menu.draw_first_page(self.leaderboard, difficulty)  # Was shown before its first update
+			self.view.menu.draw_personal_best(self.leaderboard)
+		while True:
+			try:
+				difficulty = self.leaderboard.personal_best_changes.get_nowait()
+			except queue.Empty:
+				break
+			if self.view.menu.current_display == f"{difficulty} leaderboard":
+				self.view.menu.draw_personal_best(self.leaderboard)
+		self.view.root.after(int(self.leaderboard_poll_rate * 1000), self.poll_leaderboard)
 
 	def end_game(self, difficulty: str):
-		"""Shows game over screen and uploads score to leaderboard database."""
-		self.view.menu.draw_game_over(self.model["spaceship"].score)
-		self.leaderboard.update(difficulty, self.view.menu.username, self.model["spaceship"].score)
+		"""Shows game over screen and queues score to be uploaded to leaderboard database in the background.
+
+		Difficulties without a leaderboard are not uploaded.
+		"""
+		self.view.delete_all()
+		if self.profiler_view is not None:
+			self.profiler_view.delete()
+			self.profiler_view = None
+		score = self.snapshot["stats"].score
+		self.view.menu.draw_game_over(score)
+		if DIFFICULTIES[difficulty]["leaderboard"]:
+			self.submitter.submit(difficulty, self.view.menu.username, score)
+		if self.settings["recording"]["enabled"]:
+			self.save_recording()
+
+	def save_recording(self):
+		"""Saves the recording of the last game to the recording directory."""
+		directory = self.settings["recording"]["directory"]
+		os.makedirs(directory, exist_ok=True)
+		self.recording.save(f"{directory}/{dt.datetime.now():%Y%m%d-%H%M%S}-{self.recording.difficulty}.gsr")
 
 	def bind_events(self):
 		"""Binds key down, key up, and left click."""
@@ -111,73 +188,19 @@ class Game:
 	def key_down_handler(self, event: "EventType.KeyPress"):
 		"""Adds keys being pressed to keys_pressed."""
 		self.keys_pressed.add(event.keysym)
+		self.key_mask = keys_to_mask(self.keys_pressed)
 
 	def key_up_handler(self, event: "EventType.KeyRelease"):
 		"""Remove keys from keys_pressed when released."""
 		if event.keysym in self.keys_pressed:
 			self.keys_pressed.remove(event.keysym)
+			self.key_mask = keys_to_mask(self.keys_pressed)
 
 	def mouse_up_handler(self, event: "EventType.ButtonRelease"):
-		"""Takes mouse inputs."""
-
-		def is_clicked(button_name: str):
-			"""Checks if buttons are clicked."""
-			button_x, button_y, = self.view.menu.button_pos[button_name]
-			button_width_offset, button_height_offset = GameView.resources[f"{button_name}.png"].width() // 2, \
-														GameView.resources[f"{button_name}.png"].height() // 2
-
-			if button_x - button_width_offset <= event.x <= button_x + button_width_offset and button_y - button_height_offset <= event.y <= button_y + button_height_offset:
-				return True
-
-		if self.view.menu.current_display == "menu":
-			if is_clicked("play_button"):
-				self.view.menu.draw_levels()
-			elif is_clicked("instructions_button"):
-				self.view.menu.draw_instructions()
-			elif is_clicked("leaderboard_button"):
-				self.view.menu.draw_leaderboard()
-			elif is_clicked("quit_button"):
-				self.view.root.destroy()
-
-		elif self.view.menu.current_display == "levels":
-			if is_clicked("main_menu_button"):
-				self.view.menu.draw_menu()
-			elif is_clicked("easy_button"):
-				self.start("easy")
-			elif is_clicked("medium_button"):
-				self.start("medium")
-			elif is_clicked("hard_button"):
-				self.start("hard")
-
-		elif self.view.menu.current_display == "instructions":
-			if is_clicked("main_menu_button"):
-				self.view.menu.draw_menu()
-
-		elif self.view.menu.current_display == "leaderboard":
-			if is_clicked("main_menu_button"):
-				self.view.menu.draw_menu()
-			elif is_clicked("easy_button"):
-				self.view.menu.draw_easy_leaderboard(self.leaderboard)
-			elif is_clicked("medium_button"):
-				self.view.menu.draw_medium_leaderboard(self.leaderboard)
-			elif is_clicked("hard_button"):
-				self.view.menu.draw_hard_leaderboard(self.leaderboard)
-
-		elif self.view.menu.current_display == "easy leaderboard":
-			if is_clicked("leaderboard_button"):
-				self.view.menu.draw_leaderboard()
-
-		elif self.view.menu.current_display == "medium leaderboard":
-			if is_clicked("leaderboard_button"):
-				self.view.menu.draw_leaderboard()
-
-		elif self.view.menu.current_display == "hard leaderboard":
-			if is_clicked("leaderboard_button"):
-				self.view.menu.draw_leaderboard()
-
-		elif self.view.menu.current_display == "game_over":
-			if is_clicked("main_menu_button"):
-				self.view.menu.draw_menu()
+		"""Runs the action of the button clicked, if any."""
+		action = self.view.menu.button_at(event.x, event.y)
+		if action is not None:
+			self.actions[action]()
 
 
 if __name__ == "__main__":
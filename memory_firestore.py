@@ -0,0 +1,330 @@
+"""In-memory stand-in for the parts of the Firestore client used by the leaderboard.
+
+Documents live in a dict, so leaderboards can be exercised without credentials or a network connection.
+Transactions are optimistic like Firestore's: a commit fails if a document read in the transaction was
+written since, and transactional retries the function. Snapshot listeners are called with the document when
+they start listening and after every write to it, like Firestore's on_snapshot. Write batches apply many
+writes at once and notify listeners once.
+Collections can be queried with equality and range filters, ordering, limits, and cursors; every document a
+query returns counts as a read, as Firestore bills it.
+"""
+import copy
+import functools
+import itertools
+import threading
+from typing import Callable, List
+from storage import TransactionConflict
+
+ASCENDING = "ASCENDING"  # Directions of order_by, with the same values as Firestore's Query constants
+DESCENDING = "DESCENDING"
+OPERATORS = {"==": lambda a, b: a == b, "<": lambda a, b: a < b, "<=": lambda a, b: a <= b,
+			 ">": lambda a, b: a > b, ">=": lambda a, b: a >= b}
+
+
+class DocumentSnapshot:
+	"""Copy of a document at the time it was read."""
+
+	def __init__(self, reference: "DocumentReference", data: dict, version: int):
+		"""Inits DocumentSnapshot."""
+		self.reference = reference
+		self.exists = data is not None
+		self.version = version
+		self._data = copy.deepcopy(data)
+
+	def to_dict(self) -> dict:
+		"""Returns a copy of the document's fields."""
+		return copy.deepcopy(self._data)
+
+
+class DocumentReference:
+	"""Reference to a document in a Client."""
+
+	def __init__(self, client: "Client", path: str):
+		"""Inits DocumentReference."""
+		self.client = client
+		self.path = path
+
+	def get(self, transaction: "Transaction" = None) -> "DocumentSnapshot":
+		"""Reads the document, recording the read in transaction if one is given."""
+		with self.client.lock:
+			self.client.reads += 1
+			data, version = self.client.documents.get(self.path, (None, 0))
+			snapshot = DocumentSnapshot(self, data, version)
+		if transaction is not None:
+			transaction.read_versions.setdefault(self.path, version)
+		return snapshot
+
+	def set(self, data: dict):
+		"""Replaces the document."""
+		with self.client.lock:
+			self.write("set", data)
+		self.client.notify()
+
+	def update(self, data: dict):
+		"""Replaces some fields of an existing document."""
+		with self.client.lock:
+			self.write("update", data)
+		self.client.notify()
+
+	def write(self, method: str, data: dict):
+		"""Applies a set or an update. Callers must hold the client's lock."""
+		if method == "update":
+			document = copy.deepcopy(self.client.documents[self.path][0])
+			document.update(copy.deepcopy(data))
+		else:
+			document = copy.deepcopy(data)
+		self.client.write(self.path, document)
+
+	def on_snapshot(self, callback: Callable) -> "Watch":
+		"""Calls callback([snapshot], changes, read_time) now and after every write to the document."""
+		with self.client.lock:
+			self.client.listeners.setdefault(self.path, []).append(callback)
+			data, version = self.client.documents.get(self.path, (None, 0))
+			snapshot = DocumentSnapshot(self, data, version)
+		callback([snapshot], [], None)
+		return Watch(self.client, self.client.listeners[self.path], callback)
+
+
+class Watch:
+	"""Handle of a snapshot listener."""
+
+	def __init__(self, client: "Client", listeners: list, listener):
+		"""Inits Watch for a listener in one of the client's lists of listeners."""
+		self.client = client
+		self.listeners = listeners
+		self.listener = listener
+
+	def unsubscribe(self):
+		"""Stops calling the listener."""
+		with self.client.lock:
+			self.listeners.remove(self.listener)
+
+
+class Query:
+	"""Filtered, ordered, and limited view of the documents in a collection.
+
+	Every method returns a new Query, so queries can be built up and reused like Firestore's.
+	"""
+
+	def __init__(self, client: "Client", path: str):
+		"""Inits Query for every document in the collection at path."""
+		self.client = client
+		self.path = path
+		self.filters = []  # Field, operator, and value of each where
+		self.orders = []  # Field and direction of each order_by
+		self.limit_count = None
+		self.start = None  # Field values documents must be ordered after
+		self.end = None  # Field values documents must be ordered before
+
+	def refine(self, **changes) -> "Query":
+		"""Returns a copy of the query with some attributes replaced."""
+		query = copy.copy(self)
+		for name, value in changes.items():
+			setattr(query, name, value)
+		return query
+
+	def where(self, field: str, operator: str, value) -> "Query":
+		"""Keeps only documents whose field compares to value with an operator in OPERATORS."""
+		return self.refine(filters=self.filters + [(field, OPERATORS[operator], value)])
+
+	def order_by(self, field: str, direction: str = ASCENDING) -> "Query":
+		"""Orders documents by a field, after any earlier order_by."""
+		return self.refine(orders=self.orders + [(field, direction)])
+
+	def limit(self, count: int) -> "Query":
+		"""Returns at most count documents."""
+		return self.refine(limit_count=count)
+
+	def start_after(self, values: dict) -> "Query":
+		"""Starts after the position of the ordered field values, such as the last document of a page."""
+		return self.refine(start=values)
+
+	def end_before(self, values: dict) -> "Query":
+		"""Ends before the position of the ordered field values."""
+		return self.refine(end=values)
+
+	def compare(self, a: dict, b: dict) -> int:
+		"""Returns a negative number if a is ordered before b, a positive one if after, and 0 if neither."""
+		for field, direction in self.orders:
+			if a[field] != b[field]:
+				result = -1 if a[field] < b[field] else 1
+				return -result if direction == DESCENDING else result
+		return 0
+
+	def run(self) -> List["DocumentSnapshot"]:
+		"""Returns the matching documents without counting reads."""
+		prefix = f"{self.path}/"
+		with self.client.lock:
+			documents = [(path, data, version) for path, (data, version) in self.client.documents.items()
+						 if path.startswith(prefix) and "/" not in path[len(prefix):] and data is not None
+						 and all(operator(data.get(field), value) for field, operator, value in self.filters)]
+			documents.sort(key=functools.cmp_to_key(lambda a, b: self.compare(a[1], b[1])))
+			if self.start is not None:
+				documents = [document for document in documents if self.compare(document[1], self.start) > 0]
+			if self.end is not None:
+				documents = [document for document in documents if self.compare(document[1], self.end) < 0]
+			return [DocumentSnapshot(DocumentReference(self.client, path), data, version)
+					for path, data, version in documents[:self.limit_count]]
+
+	def stream(self) -> List["DocumentSnapshot"]:
+		"""Returns the matching documents, counting a read for each one and at least one per query."""
+		snapshots = self.run()
+		with self.client.lock:
+			self.client.reads += max(1, len(snapshots))
+		return snapshots
+
+	def get(self) -> List["DocumentSnapshot"]:
+		"""Returns the matching documents, like stream."""
+		return self.stream()
+
+	def on_snapshot(self, callback: Callable) -> "Watch":
+		"""Calls callback(snapshots, changes, read_time) now and after every write to the collection."""
+		listener = (self, callback)
+		with self.client.lock:
+			self.client.query_listeners.append(listener)
+		callback(self.run(), [], None)
+		return Watch(self.client, self.client.query_listeners, listener)
+
+
+class CollectionReference(Query):
+	"""Reference to a collection in a Client, which is also a query for all of its documents."""
+
+	def document(self, name: str = None) -> "DocumentReference":
+		"""Returns a reference to a document in this collection, with a generated id if no name is given."""
+		if name is None:
+			name = f"{next(self.client.ids):020d}"
+		return DocumentReference(self.client, f"{self.path}/{name}")
+
+	def add(self, data: dict) -> tuple:
+		"""Stores data as a new document with a generated id and returns None and a reference to it."""
+		reference = self.document()
+		reference.set(data)
+		return None, reference
+
+
+class Transaction:
+	"""Buffers writes and commits them only if nothing it read has changed."""
+
+	def __init__(self, client: "Client"):
+		"""Inits Transaction."""
+		self.client = client
+		self.read_versions = {}  # Maps document paths to the version read
+		self.writes = []
+
+	def update(self, reference: "DocumentReference", data: dict):
+		"""Buffers an update to a document."""
+		self.writes.append(("update", reference, data))
+
+	def set(self, reference: "DocumentReference", data: dict):
+		"""Buffers replacing a document."""
+		self.writes.append(("set", reference, data))
+
+	def commit(self):
+		"""Applies the buffered writes, or raises TransactionConflict if a document read has changed."""
+		with self.client.lock:
+			for path, version in self.read_versions.items():
+				if self.client.documents.get(path, (None, 0))[1] != version:
+					raise TransactionConflict(path)
+			for method, reference, data in self.writes:
+				reference.write(method, data)
+		self.client.notify()
+
+	def reset(self):
+		"""Forgets reads and writes so the transaction can be retried."""
+		self.read_versions = {}
+		self.writes = []
+
+
+class WriteBatch:
+	"""Buffers writes and commits them together, without reading anything first."""
+	max_writes = 500  # Most writes Firestore accepts in one batch
+
+	def __init__(self, client: "Client"):
+		"""Inits WriteBatch."""
+		self.client = client
+		self.writes = []
+
+	def set(self, reference: "DocumentReference", data: dict):
+		"""Buffers replacing a document."""
+		self.writes.append(("set", reference, data))
+
+	def update(self, reference: "DocumentReference", data: dict):
+		"""Buffers an update to a document."""
+		self.writes.append(("update", reference, data))
+
+	def commit(self):
+		"""Applies the buffered writes at once, raising ValueError if there are more than Firestore allows."""
+		if len(self.writes) > self.max_writes:
+			raise ValueError(f"Batches hold at most {self.max_writes} writes, not {len(self.writes)}")
+		with self.client.lock:
+			for method, reference, data in self.writes:
+				reference.write(method, data)
+		self.client.notify()
+
+
+class Client:
+	"""In-memory database of documents."""
+
+	def __init__(self, documents: dict = None):
+		"""Inits Client, optionally with documents keyed by path such as "gsa/leaderboard"."""
+		self.lock = threading.RLock()
+		self.documents = {path: (copy.deepcopy(data), 1) for path, data in (documents or {}).items()}
+		self.reads = 0
+		self.writes = 0
+		self.listeners = {}  # Maps document paths to snapshot listeners
+		self.query_listeners = []  # Queries and their snapshot listeners
+		self.changed = []  # Paths written since listeners were last notified
+		self.ids = itertools.count(1)  # Ids of documents created by CollectionReference.add
+
+	def write(self, path: str, data: dict):
+		"""Stores a document and bumps its version. Callers must hold lock."""
+		self.writes += 1
+		self.documents[path] = (data, self.documents.get(path, (None, 0))[1] + 1)
+		self.changed.append(path)
+
+	def notify(self):
+		"""Calls the listeners of every document written since the last call.
+
+		Listeners are called without holding lock, so they may use the client themselves.
+		"""
+		with self.lock:
+			changed = list(dict.fromkeys(self.changed))
+			self.changed = []
+			deliveries = [(callback, DocumentSnapshot(DocumentReference(self, path), *self.documents[path]))
+						  for path in changed for callback in self.listeners.get(path, ())]
+			collections = {path.rsplit("/", 1)[0] for path in changed}
+			queries = [(query, callback) for query, callback in self.query_listeners if query.path in collections]
+		for callback, snapshot in deliveries:
+			callback([snapshot], [], None)
+		for query, callback in queries:
+			callback(query.run(), [], None)
+
+	def collection(self, name: str) -> "CollectionReference":
+		"""Returns a reference to a collection."""
+		return CollectionReference(self, name)
+
+	def transaction(self) -> "Transaction":
+		"""Returns a new transaction."""
+		return Transaction(self)
+
+	def batch(self) -> "WriteBatch":
+		"""Returns a new write batch."""
+		return WriteBatch(self)
+
+
+def transactional(function: Callable, max_attempts: int = 5) -> Callable:
+	"""Wraps function(transaction, ...) so it is retried until its transaction commits, like firestore.transactional."""
+
+	def run_in_transaction(transaction: "Transaction", *args, **kwargs):
+		"""Runs and commits function, retrying when another writer got there first."""
+		for attempt in range(max_attempts):
+			transaction.reset()
+			result = function(transaction, *args, **kwargs)
+			try:
+				transaction.commit()
+				return result
+			except TransactionConflict:
+				if attempt == max_attempts - 1:
+					raise
+
+	return run_in_transaction
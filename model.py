@@ -1,8 +1,12 @@
 import datetime as dt
-import firebase_admin
-from firebase_admin import credentials, firestore
+import queue
+import threading
 from abc import abstractmethod, ABCMeta
-from typing import List, Set
+from math import isfinite
+from time import monotonic
+from types import MappingProxyType
+from typing import Callable, Dict, Iterator, List, Mapping, NamedTuple, Optional, Set, Tuple
+from storage import TIMESTAMP_FORMAT, FirestoreBackend, sort_key
 
 
 class GameModel:
@@ -23,76 +27,467 @@ class GameModel:
 		"""Returns model for a specified key."""
 		return self.object_models[item]
 
+	def save_positions(self):
+		"""Saves the current position of every model so views can interpolate towards the next one."""
+		for models in self.object_models.values():
+			for model in models if type(models) == list else [models]:
+				model.save_pos()
+
+	def snapshot(self) -> Mapping[str, object]:
+		"""Returns an immutable copy of every model, keyed like object_models, that views can draw on another thread.
+
+		Lists of models become tuples of Snapshots.
+		"""
+		snapshot = {}
+		for key, models in self.object_models.items():
+			if type(models) == list:
+				snapshot[key] = tuple(model.snapshot() for model in models)
+			else:
+				snapshot[key] = models.snapshot()
+		return MappingProxyType(snapshot)
+
+
+class Snapshot(NamedTuple):
+	"""Immutable copy of a Collidable at the end of a tick, holding what views draw."""
+	type: type
+	x: float
+	y: float
+	prev_x: float
+	prev_y: float
+	r: float
+	hp: int = 0  # Stats are only copied from a SpaceshipModel
+	fuel: float = 0
+	score: int = 0
+
+	def interpolate_pos(self, alpha: float) -> Tuple[float, float]:
+		"""Returns the position a fraction alpha of the way from the start of the tick to the position at its end."""
+		return self.prev_x + (self.x - self.prev_x) * alpha, self.prev_y + (self.y - self.prev_y) * alpha
+
 
 class LeaderboardModel:
-	"""Handles leaderboard connection and updates."""
+	"""Handles leaderboard connection and updates.
 
-	def __init__(self):
+	Leaderboards are cached for ttl seconds. Stale leaderboards are still returned straight away while a
+	background thread reads the database again, so at most one read is made per ttl.
+	When subscribed, the backend pushes changed leaderboards into the cache instead, so it is never read again
+	and the rows that changed are queued in changes for views to patch.
+	"""
+
+	def __init__(self, connect: Callable[[], "LeaderboardBackend"] = FirestoreBackend, ttl: float = 60,
+				 subscribe: bool = False):
 		"""Inits LeaderboardModel.
 
-		Creates connection to firestore database.
-		Stores a reference to leaderboard document.
+		Stores leaderboards in the backend returned by connect, which connects to the firestore database by default.
+		The backend is connected on a background thread so creating the model never waits for the network.
 		"""
-		self.cred = credentials.Certificate("config/service_creds.json")
-		firebase_admin.initialize_app(self.cred)
-		self.db = firestore.client()
-		self.doc_ref = self.db.collection("gsa").document("leaderboard")
-		self.doc_ref.get()
-		self.datetime_format = "%Y/%m/%d %H:%M:%S.%f"  # Format for time: YYYY/MM/DD HH:MM:SS.MMMMMM
+		self.connect = connect
+		self.backend = None
+		self.backend_lock = threading.Lock()
+		self.datetime_format = TIMESTAMP_FORMAT
+		self.ttl = ttl
+		self.cache = {}  # Maps difficulty to the time it was read and its leaderboard
+		self.cache_lock = threading.Condition()  # Also notified when a background refresh finishes
+		self.refreshing = False
+		self.subscribed = subscribe
+		self.changes = queue.Queue()  # Pairs of a difficulty and the indexes of the rows that changed
+		self.personal_bests = {}  # Maps (difficulty, username) to the player's best entry, or None
+		self.personal_bests_loading = set()  # Keys of personal bests being read on a background thread
+		self.personal_best_changes = queue.Queue()  # Difficulties whose personal bests finished loading
+		if subscribe:
+			self.listen()
+		else:
+			self.refresh()
+
+	def get_backend(self) -> "LeaderboardBackend":
+		"""Returns the backend, connecting it first if no thread has yet."""
+		with self.backend_lock:
+			if self.backend is None:
+				self.backend = self.connect()
+			return self.backend
+
+	def parse(self, document: Dict[str, List[dict]]):
+		"""Turns the timestamps of every entry in leaderboards from the database into datetimes."""
+		for leaderboard in document.values():
+			for entry in leaderboard:
+				entry["timestamp"] = dt.datetime.strptime(entry["timestamp"], self.datetime_format)
+
+	def read(self) -> Dict[str, List[dict]]:
+		"""Reads every leaderboard from the database, stores them in the cache, and returns them."""
+		document = self.get_backend().read()
+		read_time = monotonic()
+		self.parse(document)
+		with self.cache_lock:
+			for difficulty, leaderboard in document.items():
+				self.cache[difficulty] = (read_time, leaderboard)
+		return document
+
+	def refresh(self):
+		"""Reads every leaderboard into the cache on a background thread, unless one is already doing so."""
+		with self.cache_lock:
+			if self.refreshing:
+				return
+			self.refreshing = True
+
+		def refresh_worker():
+			"""Reads the leaderboards and allows the next refresh."""
+			try:
+				self.read()
+			finally:
+				self.end_refresh()
+
+		threading.Thread(target=refresh_worker, daemon=True).start()
+
+	def end_refresh(self):
+		"""Wakes callers waiting for leaderboards to be cached."""
+		with self.cache_lock:
+			self.refreshing = False
+			self.cache_lock.notify_all()
+
+	def listen(self):
+		"""Subscribes to every leaderboard on a background thread. The first update fills the cache."""
+		with self.cache_lock:
+			self.refreshing = True
+
+		def listen_worker():
+			"""Subscribes to the backend, waking waiting callers if that fails."""
+			try:
+				self.get_backend().subscribe(self.apply)
+			except Exception:
+				self.end_refresh()
+				raise
+
+		threading.Thread(target=listen_worker, daemon=True).start()
+
+	def apply(self, document: Dict[str, List[dict]]):
+		"""Replaces cached leaderboards with ones pushed by the backend and queues the indexes of changed rows."""
+		receive_time = monotonic()
+		self.parse(document)
+		for difficulty, leaderboard in document.items():
+			with self.cache_lock:
+				old = self.cache.get(difficulty, (None, []))[1]
+				self.cache[difficulty] = (receive_time, leaderboard)
+			changed = [i for i in range(max(len(old), len(leaderboard)))
+					   if i >= len(old) or i >= len(leaderboard) or old[i] != leaderboard[i]]
+			if changed:
+				self.changes.put((difficulty, changed))
+		self.end_refresh()
+
+	def invalidate(self, difficulty: str):
+		"""Drops a cached leaderboard and starts reading the database again."""
+		with self.cache_lock:
+			self.cache.pop(difficulty, None)
+		self.refresh()
 
 	def get(self, difficulty: str) -> List[dict]:
-		"""Gets current leaderboard from database."""
-		leaderboard = self.doc_ref.get().to_dict()[difficulty]
-		for entry in leaderboard:
-			entry["timestamp"] = dt.datetime.strptime(entry["timestamp"], self.datetime_format)
-		return leaderboard
-
-	def update(self, difficulty: str, username: str, score: int):
-		"""Adds current entry to leaderboard if it is a high score."""
-		timestamp = dt.datetime.now()
-		entry = {"username": username, "score": score, "timestamp": timestamp}
-		leaderboard = self.get(difficulty)
-		leaderboard.append(entry)
-		leaderboard.sort(key=lambda e: (-e["score"], e["timestamp"], e[
-			"username"]))  # Sorts leaderboard by highest score, then lowest time, then alphabetically
-		leaderboard.pop()  # Removes last entry in leaderboard, also known as the lowest score
-		for entry in leaderboard:
-			entry["timestamp"] = entry["timestamp"].strftime(self.datetime_format)
-		self.doc_ref.update({difficulty: leaderboard})
+		"""Gets current leaderboard, only waiting for the database when it has not been cached.
+
+		When subscribed, nothing is waited for: a leaderboard still waiting for its first update is returned empty,
+		and queued in changes once the update arrives, since the update might never come while offline.
+		"""
+		with self.cache_lock:
+			while difficulty not in self.cache and self.refreshing and not self.subscribed:
+				self.cache_lock.wait()  # Waits for the refresh already reading it instead of reading it again
+			cached = self.cache.get(difficulty)
+			loading = cached is None and self.refreshing
+		if loading:
+			return []
+		if cached is None:
+			leaderboard = self.read()[difficulty]
+		else:
+			read_time, leaderboard = cached
+			if not self.subscribed and monotonic() - read_time > self.ttl:
+				self.refresh()
+		return [dict(entry) for entry in leaderboard]  # Copies entries so callers cannot change the cache
+
+	def page(self, difficulty: str, after: dict, size: int = 10) -> List[dict]:
+		"""Reads up to size entries ranked after after, the last entry of the previous page.
+
+		Pages are never cached, since only the first page is shown often enough to be worth it.
+		"""
+		cursor = {**after, "timestamp": after["timestamp"].strftime(self.datetime_format)}
+		entries = self.get_backend().page(difficulty, cursor, size)
+		self.parse({difficulty: entries})
+		return entries
+
+	def pageable(self) -> bool:
+		"""Returns whether the backend can read pages past the leaderboard.
+
+		Connects the backend if it is not yet, which get has always done by the time a leaderboard is shown.
+		"""
+		return self.get_backend().pageable
+
+	def personal_best(self, difficulty: str, username: str) -> Tuple[bool, Optional[dict]]:
+		"""Returns whether a player's best entry is known yet, and the entry or None if they have no score.
+
+		Backends that keep only the leaderboard are answered from the cached leaderboard, so no extra reads are
+		made. Otherwise the entry is read on a background thread the first time it is asked for, and its
+		difficulty is queued in personal_best_changes once it is known.
+		"""
+		if not self.pageable():
+			leaderboard = self.get(difficulty)
+			with self.cache_lock:
+				known = difficulty in self.cache
+			return known, next((entry for entry in leaderboard if entry["username"] == username), None)
+		key = (difficulty, username)
+		if key in self.personal_bests:
+			best = self.personal_bests[key]
+			return True, None if best is None else dict(best)
+		if key not in self.personal_bests_loading:
+			self.personal_bests_loading.add(key)
+			threading.Thread(target=self.load_personal_best, args=(difficulty, username), daemon=True).start()
+		return False, None
+
+	def load_personal_best(self, difficulty: str, username: str):
+		"""Reads a player's best entry into the cache and queues its difficulty."""
+		key = (difficulty, username)
+		try:
+			best = self.get_backend().personal_best(difficulty, username)
+			if best is not None:
+				self.parse({difficulty: [best]})
+			self.personal_bests[key] = best
+		finally:
+			self.personal_bests_loading.discard(key)
+		self.personal_best_changes.put(difficulty)
+
+	def update_personal_best(self, difficulty: str, entry: dict):
+		"""Replaces a cached personal best with a stored entry that beats it."""
+		key = (difficulty, entry["username"])
+		entry = {**entry, "timestamp": dt.datetime.strptime(entry["timestamp"], self.datetime_format)}
+		if key in self.personal_bests and (self.personal_bests[key] is None
+										   or sort_key(entry) < sort_key(self.personal_bests[key])):
+			self.personal_bests[key] = entry
+
+	def qualifies(self, difficulty: str, entry: dict) -> bool:
+		"""Checks an entry against the lowest cached score, which can only be lower than the real one.
+
+		Returns True if nothing is cached yet.
+		"""
+		with self.cache_lock:
+			cached = self.cache.get(difficulty)
+		return cached is None or not cached[1] or sort_key(entry) < sort_key(cached[1][-1])
+
+	def update(self, difficulty: str, username: str, score: int, timestamp: dt.datetime = None) -> bool:
+		"""Adds an entry to leaderboard if it is a high score.
+
+		The entry is timestamped now unless the time it was achieved is given.
+		Unless the backend keeps every score, scores that cannot make the leaderboard are rejected without
+		contacting the database.
+		Returns whether the entry made the leaderboard.
+		"""
+		entry = {"username": username, "score": score, "timestamp": timestamp or dt.datetime.now()}
+		backend = self.get_backend()
+		if not backend.stores_every_score and not self.qualifies(difficulty, entry):
+			return False
+		entry["timestamp"] = entry["timestamp"].strftime(self.datetime_format)  # Sorts like the datetime it formats
+		added = backend.insert(difficulty, entry)
+		if added or backend.stores_every_score:
+			self.update_personal_best(difficulty, entry)
+		if added and not self.subscribed:
+			self.invalidate(difficulty)  # Subscribed caches are updated by the backend instead
+		return added
+
+
+class SpatialHash:
+	"""Uniform grid of Collidables used to find the ones close enough to collide.
+
+	Cells are twice as wide as the largest hitbox radius, so Collidables can only touch if they are in the same
+	or neighbouring cells. Collidables update their cell themselves when they move.
+	"""
+
+	def __init__(self, max_r: float, margin: float = 0):
+		"""Inits SpatialHash for Collidables with a radius of at most max_r.
+
+		margin widens the cells for swept collisions, by how far two Collidables can move towards each other
+		in one tick.
+		"""
+		self.margin = margin
+		self.max_r = max_r
+		self.cell_size = 2 * max_r + margin
+		self.cells = {}  # Maps (column, row) to the Collidables in that cell, in insertion order
+		self.cell_of = {}  # Maps each Collidable to its cell
+
+	def get_cell(self, collidable: "Collidable") -> Optional[Tuple[int, int]]:
+		"""Returns the cell containing a Collidable, or None if it was destroyed."""
+		if not (isfinite(collidable.x) and isfinite(collidable.y)):
+			return None
+		return int(collidable.x // self.cell_size), int(collidable.y // self.cell_size)
+
+	def insert(self, collidable: "Collidable"):
+		"""Adds a Collidable, growing the cells first if its radius is larger than any so far."""
+		if collidable.r > self.max_r:
+			self.resize(collidable.r)
+		collidable.spatial_hash = self
+		self.cell_of[collidable] = None
+		self.update(collidable)
+
+	def remove(self, collidable: "Collidable"):
+		"""Removes a Collidable if it is in the grid."""
+		if collidable in self.cell_of:
+			self.move_to_cell(collidable, None)
+			del self.cell_of[collidable]
+		collidable.spatial_hash = None
+
+	def update(self, collidable: "Collidable"):
+		"""Moves a Collidable to the cell matching its position."""
+		cell = self.get_cell(collidable)
+		if cell != self.cell_of[collidable]:
+			self.move_to_cell(collidable, cell)
+
+	def move_to_cell(self, collidable: "Collidable", cell: Optional[Tuple[int, int]]):
+		"""Moves a Collidable out of its current cell and into another, or into none."""
+		old_cell = self.cell_of[collidable]
+		if old_cell is not None:
+			del self.cells[old_cell][collidable]
+			if not self.cells[old_cell]:
+				del self.cells[old_cell]
+		if cell is not None:
+			self.cells.setdefault(cell, {})[collidable] = None
+		self.cell_of[collidable] = cell
+
+	def set_margin(self, margin: float):
+		"""Rebuilds the grid with a new margin, such as when Driftables speed up."""
+		self.margin = margin
+		self.resize(self.max_r)
+
+	def resize(self, max_r: float):
+		"""Rebuilds the grid for Collidables with a radius of at most max_r."""
+		collidables = list(self.cell_of)
+		self.max_r = max_r
+		self.cell_size = 2 * max_r + self.margin
+		self.cells = {}
+		self.cell_of = {}
+		for collidable in collidables:
+			self.cell_of[collidable] = None
+			self.update(collidable)
+
+	def nearby(self, collidable: "Collidable") -> List["Collidable"]:
+		"""Returns the other Collidables in the grid close enough that they might touch a Collidable."""
+		cell = self.get_cell(collidable)
+		if cell is None:
+			return []
+		column, row = cell
+		candidates = []
+		for neighbour in ((column + i, row + j) for i in (-1, 0, 1) for j in (-1, 0, 1)):
+			for other in self.cells.get(neighbour, ()):
+				if other is not collidable:
+					candidates.append(other)
+		return candidates
+
+	def pairs(self) -> Iterator[Tuple["Collidable", "Collidable"]]:
+		"""Yields every pair of Collidables in the grid that might touch each other, each pair once."""
+		for (column, row), cell in self.cells.items():
+			members = list(cell)
+			for i in range(len(members)):
+				for other in members[i + 1:]:
+					yield members[i], other
+			for neighbour in ((column + 1, row - 1), (column + 1, row), (column + 1, row + 1), (column, row + 1)):
+				for other in self.cells.get(neighbour, ()):  # Half of the neighbours so no pair is found twice
+					for collidable in members:
+						yield collidable, other
+
+
+class DriftablePool:
+	"""Recycles Driftables that went offscreen or were destroyed instead of allocating new ones."""
+
+	def __init__(self, capacity: int = 64):
+		"""Inits DriftablePool, keeping at most capacity unused Driftables of each type (0 disables recycling)."""
+		self.capacity = capacity
+		self.free = {}  # Maps Driftable types to unused Driftables of that type
+		self.allocations = 0  # Number of Driftables created because none could be recycled
+
+	def acquire(self, driftable_type: type, x: int, y: int, r: int, dx: int, dy: int) -> "Driftable":
+		"""Returns a recycled or new Driftable of a type with the given position, radius, and deltas."""
+		free = self.free.get(driftable_type)
+		if free:
+			driftable = free.pop()
+			driftable.__init__(x, y, r, dx, dy)  # Reinitializes the recycled Driftable
+			return driftable
+		self.allocations += 1
+		return driftable_type(x, y, r, dx, dy)
+
+	def release(self, driftable: "Driftable"):
+		"""Returns a Driftable that is no longer used to the pool."""
+		free = self.free.setdefault(type(driftable), [])
+		if len(free) < self.capacity:
+			free.append(driftable)
 
 
 class ObjectModel(metaclass=ABCMeta):
-	"""Contains all objects with models that may update."""
+	"""Contains all objects with models that may update.
+
+	Models declare __slots__ so they do not carry a per-instance __dict__.
+	"""
+	__slots__ = ("x", "y", "prev_x", "prev_y")
 
 	def __init__(self, x: int, y: int):
 		"""Inits ObjectModel."""
 		self.x = x
 		self.y = y
+		self.prev_x = x  # Position at the start of the current tick
+		self.prev_y = y
+
+	def save_pos(self):
+		"""Saves the current position as the position at the start of the tick."""
+		self.prev_x = self.x
+		self.prev_y = self.y
+
+	def interpolate_pos(self, alpha: float) -> Tuple[float, float]:
+		"""Returns the position a fraction alpha of the way from the start of the tick to the current position."""
+		return self.prev_x + (self.x - self.prev_x) * alpha, self.prev_y + (self.y - self.prev_y) * alpha
 
 
 class Collidable(ObjectModel):
 	"""Contains all objects that may collide with others."""
+	__slots__ = ("r", "spatial_hash")
 
 	def __init__(self, x: int, y: int, r: int):
 		"""Inits Collidable."""
 		super().__init__(x, y)
 		self.r = r  # Radius of hitbox
+		self.spatial_hash = None  # SpatialHash that is kept up to date when this moves
 
 	def update_pos(self, x_offset: int, y_offset: int):
 		"""Updates the x, y position by offsets."""
 		self.x += x_offset
 		self.y += y_offset
+		if self.spatial_hash is not None:
+			self.spatial_hash.update(self)
 
-	def collided(self, other: "Driftable"):
-		"""Checks if a Collidable has collided with a Driftable."""
+	def snapshot(self) -> "Snapshot":
+		"""Returns an immutable copy of the Collidable."""
+		return Snapshot(type(self), self.x, self.y, self.prev_x, self.prev_y, self.r)
+
+	def touches(self, other: "Driftable") -> bool:
+		"""Returns whether a Collidable and a Driftable overlap at their current positions."""
 		distance = ((self.x - other.x) ** 2 + (self.y - other.y) ** 2) ** 0.5  # Distance between Collidables
+		return distance < self.r + other.r
+
+	def swept_touches(self, other: "Driftable") -> bool:
+		"""Returns whether a Collidable and a Driftable overlapped at any time since the last collision check.
 
-		if distance < self.r + other.r:
+		The Collidable moved in a straight line from where it started the tick, and the Driftable from where it
+		was before it last drifted, so the closest they came is found by projecting onto their relative motion.
+		"""
+		start_x = self.prev_x - (other.x - other.dx)  # Offset between the two at the last collision check
+		start_y = self.prev_y - (other.y - other.dy)
+		move_x = self.x - self.prev_x - other.dx  # Change in that offset since
+		move_y = self.y - self.prev_y - other.dy
+		length = move_x * move_x + move_y * move_y
+		t = 0.0 if length == 0 else min(1.0, max(0.0, -(start_x * move_x + start_y * move_y) / length))
+		closest_x = start_x + t * move_x
+		closest_y = start_y + t * move_y
+		reach = self.r + other.r
+		return closest_x * closest_x + closest_y * closest_y < reach * reach
+
+	def collided(self, other: "Driftable", swept: bool = False):
+		"""Checks if a Collidable has collided with a Driftable, over the whole tick if swept is set."""
+		if self.swept_touches(other) if swept else self.touches(other):
 			other.aftermath(self)  # Runs what should happen once Collidables touch
 
 
 class Driftable(Collidable):
 	"""Contains all objects that move at a constant speed and collide."""
+	__slots__ = ("dx", "dy")
 
 	def __init__(self, x: int, y: int, r: int, dx: int, dy: int):
 		"""Inits Driftable."""
@@ -131,6 +526,7 @@ class Driftable(Collidable):
 
 class SpaceshipModel(Collidable):
 	"""Model for spaceship."""
+	__slots__ = ("hp", "fuel", "score", "movement_speed")
 
 	def __init__(self, x: int, y: int, r: int, hp: int, fuel: int):
 		"""Inits SpaceshipModel."""
@@ -140,6 +536,11 @@ class SpaceshipModel(Collidable):
 		self.score = 0
 		self.movement_speed = 10
 
+	def snapshot(self) -> "Snapshot":
+		"""Returns an immutable copy of the spaceship and its stats."""
+		return Snapshot(SpaceshipModel, self.x, self.y, self.prev_x, self.prev_y, self.r, self.hp, self.fuel,
+						self.score)
+
 	def move(self, keys_pressed: Set[str], game_width: int, game_height: int, fuel_consumption: int):
 		"""Moves spaceship within bounds of screen based on keys pressed."""
 		vx = 0
@@ -170,6 +571,7 @@ class SpaceshipModel(Collidable):
 
 class AsteroidModel(Driftable):
 	"""Model for asteroid."""
+	__slots__ = ()
 
 	def aftermath(self, spaceship_model: "SpaceshipModel"):
 		"""Removes 1 hp from spaceship and destroys itself."""
@@ -179,26 +581,34 @@ class AsteroidModel(Driftable):
 
 class HpPowerUpModel(Driftable):
 	"""Model for HP power-up."""
+	__slots__ = ()
+	hp_gain = 1  # Effects are class attributes so balance sweeps can change them
+	max_hp = 9
 
 	def aftermath(self, spaceship_model: "SpaceshipModel"):
 		"""Adds 1 HP to spaceship (9 max) and destroys itself."""
-		spaceship_model.hp = min(spaceship_model.hp + 1, 9)
+		spaceship_model.hp = min(spaceship_model.hp + self.hp_gain, self.max_hp)
 		self.destroy()
 
 
 class FuelPowerUpModel(Driftable):
 	"""Model for fuel power-up."""
+	__slots__ = ()
+	fuel_gain = 20
+	max_fuel = 100
 
 	def aftermath(self, spaceship_model: "SpaceshipModel"):
 		"""Adds 20 fuel to spaceship (100 max) and destroys itself."""
-		spaceship_model.fuel = min(spaceship_model.fuel + 20, 100)
+		spaceship_model.fuel = min(spaceship_model.fuel + self.fuel_gain, self.max_fuel)
 		self.destroy()
 
 
 class ScorePowerUpModel(Driftable):
 	"""Model for score power-up."""
+	__slots__ = ()
+	score_gain = 5000
 
 	def aftermath(self, spaceship_model: "SpaceshipModel"):
 		"""Adds 5000 score to spaceship and destroys itself."""
-		spaceship_model.score += 5000
+		spaceship_model.score += self.score_gain
 		self.destroy()
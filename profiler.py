@@ -0,0 +1,112 @@
+import csv
+import json
+import threading
+from collections import deque
+from statistics import quantiles
+from time import perf_counter
+from typing import Dict, Tuple
+
+PHASES = ("move", "collide", "drift", "draw", "idle")  # Idle is the rest of the frame, spent in Tkinter
+
+
+class NullProfiler:
+	"""Profiler that records nothing, used when profiling is off."""
+
+	def start(self):
+		"""Does nothing."""
+		pass
+
+	def lap(self, phase: str):
+		"""Does nothing."""
+		pass
+
+	def count_operations(self, operations: int):
+		"""Does nothing."""
+		pass
+
+	def end_frame(self):
+		"""Does nothing."""
+		pass
+
+
+class FrameProfiler(NullProfiler):
+	"""Times the phases of every frame and keeps rolling percentiles of the last window frames.
+
+	Phases are timed with start followed by one lap per phase; a phase may be lapped several times in one frame,
+	such as when several simulation ticks run before a frame is drawn. Each thread times its own phases, so a
+	simulation thread and the render thread can share a profiler, though idle time then overlaps simulation.
+	"""
+
+	def __init__(self, window: int = 300):
+		"""Inits FrameProfiler."""
+		self.window = window
+		self.history = {phase: deque(maxlen=window) for phase in PHASES}  # Seconds per frame spent in each phase
+		self.frame_times = deque(maxlen=window)
+		self.operations = deque(maxlen=window)  # Canvas operations per frame
+		self.trace = []  # Frame time and phase times of every frame, for dump
+		self.current = dict.fromkeys(PHASES, 0.0)
+		self.current_operations = 0
+		self.timing = threading.local()  # Holds the time of each thread's last start or lap
+		self.last_frame_end = None
+
+	def start(self):
+		"""Starts timing the next phase."""
+		self.timing.last_lap = perf_counter()
+
+	def lap(self, phase: str):
+		"""Adds the time since start or the last lap to a phase."""
+		now = perf_counter()
+		self.current[phase] += now - self.timing.last_lap
+		self.timing.last_lap = now
+
+	def count_operations(self, operations: int):
+		"""Adds canvas operations to the current frame."""
+		self.current_operations += operations
+
+	def end_frame(self):
+		"""Records the current frame. The time since the last frame not spent in a phase counts as idle."""
+		now = perf_counter()
+		if self.last_frame_end is not None:
+			frame_time = now - self.last_frame_end
+			self.current["idle"] = max(0.0, frame_time - sum(self.current.values()))
+			self.frame_times.append(frame_time)
+			self.operations.append(self.current_operations)
+			for phase in PHASES:
+				self.history[phase].append(self.current[phase])
+			self.trace.append((frame_time, *(self.current[phase] for phase in PHASES), self.current_operations))
+		self.current = dict.fromkeys(PHASES, 0.0)
+		self.current_operations = 0
+		self.last_frame_end = now
+
+	def fps(self) -> float:
+		"""Returns frames per second over the window."""
+		return len(self.frame_times) / sum(self.frame_times) if self.frame_times else 0.0
+
+	def canvas_operations(self) -> float:
+		"""Returns mean canvas operations per frame over the window."""
+		return sum(self.operations) / len(self.operations) if self.operations else 0.0
+
+	def percentiles(self, phase: str) -> Tuple[float, float, float]:
+		"""Returns the p50, p95 and p99 of a phase over the window in seconds, or of whole frames for "frame"."""
+		times = self.frame_times if phase == "frame" else self.history[phase]
+		if len(times) < 2:
+			return 0.0, 0.0, 0.0
+		cuts = quantiles(times, n=100)
+		return cuts[49], cuts[94], cuts[98]
+
+	def summary(self) -> Dict[str, Tuple[float, float, float]]:
+		"""Returns the percentiles of whole frames and of every phase."""
+		return {phase: self.percentiles(phase) for phase in ("frame",) + PHASES}
+
+	def dump(self, path: str):
+		"""Writes every recorded frame to a CSV file, or to a JSON file with a summary if path ends in .json."""
+		columns = ("frame",) + PHASES + ("canvas_ops",)
+		if path.endswith(".json"):
+			with open(path, "w") as file:
+				json.dump({"fps": self.fps(), "canvas_ops": self.canvas_operations(), "percentiles": self.summary(),
+						   "columns": columns, "frames": self.trace}, file)
+		else:
+			with open(path, "w", newline="") as file:
+				writer = csv.writer(file)
+				writer.writerow(columns)
+				writer.writerows(self.trace)
@@ -0,0 +1,142 @@
+"""Records the keys pressed each tick of a game and replays them without a display.
+
+A recording is a header with the simulation seed and difficulty, followed by the per-tick bitmask of the
+keys w, a, s, d, and q, run-length encoded because keys are usually held for many ticks.
+
+Usage:
+	python replay.py <recording>
+"""
+import struct
+import sys
+from typing import Iterator, Set, Tuple
+from simulation import Simulation
+
+KEYS = "wasdq"  # Key for each bit of a bitmask, lowest bit first
+MAGIC = b"GSAR"
+VERSION = 1
+HEADER = struct.Struct("<4sBBQIB")  # Magic, version, flags, seed, number of ticks, length of difficulty name
+SWEPT_COLLISIONS = 1  # Flag set when the game checked collisions over each tick's whole movement
+
+
+def keys_to_mask(keys_pressed: Set[str]) -> int:
+	"""Returns the bitmask of the recorded keys in keys_pressed."""
+	mask = 0
+	for bit, key in enumerate(KEYS):
+		if key in keys_pressed:
+			mask |= 1 << bit
+	return mask
+
+
+def mask_to_keys(mask: int) -> Set[str]:
+	"""Returns the set of keys in a bitmask."""
+	return {key for bit, key in enumerate(KEYS) if mask & 1 << bit}
+
+
+def write_varint(buffer: bytearray, value: int):
+	"""Appends an unsigned integer using 7 bits per byte."""
+	while value >= 0x80:
+		buffer.append(value & 0x7F | 0x80)
+		value >>= 7
+	buffer.append(value)
+
+
+def read_varint(data: bytes, offset: int) -> Tuple[int, int]:
+	"""Reads an unsigned integer written by write_varint and returns it and the offset after it."""
+	value = 0
+	shift = 0
+	while True:
+		byte = data[offset]
+		offset += 1
+		value |= (byte & 0x7F) << shift
+		if byte < 0x80:
+			return value, offset
+		shift += 7
+
+
+class Recording:
+	"""Seed, difficulty, and keys pressed each tick of one game."""
+
+	def __init__(self, difficulty: str, seed: int, flags: int = 0):
+		"""Inits an empty Recording."""
+		self.difficulty = difficulty
+		self.seed = seed
+		self.flags = flags  # Reserved for simulation options that change the outcome of a game
+		self.ticks = 0
+		self.runs = []  # Pairs of a bitmask and the number of consecutive ticks it was pressed for
+
+	def record(self, keys_pressed: Set[str]):
+		"""Adds the keys pressed during one tick."""
+		mask = keys_to_mask(keys_pressed)
+		if self.runs and self.runs[-1][0] == mask:
+			self.runs[-1][1] += 1
+		else:
+			self.runs.append([mask, 1])
+		self.ticks += 1
+
+	def masks(self) -> Iterator[int]:
+		"""Yields the bitmask of each tick."""
+		for mask, count in self.runs:
+			for i in range(count):
+				yield mask
+
+	def inputs(self) -> Iterator[Set[str]]:
+		"""Yields the keys pressed each tick, for Simulation.run."""
+		sets = {}  # Shares one set per bitmask
+		for mask in self.masks():
+			if mask not in sets:
+				sets[mask] = mask_to_keys(mask)
+			yield sets[mask]
+
+	def to_bytes(self) -> bytes:
+		"""Encodes the recording."""
+		difficulty = self.difficulty.encode()
+		buffer = bytearray(HEADER.pack(MAGIC, VERSION, self.flags, self.seed, self.ticks, len(difficulty)))
+		buffer += difficulty
+		for mask, count in self.runs:
+			buffer.append(mask)
+			write_varint(buffer, count)
+		return bytes(buffer)
+
+	@staticmethod
+	def from_bytes(data: bytes) -> "Recording":
+		"""Decodes a recording made by to_bytes."""
+		magic, version, flags, seed, ticks, difficulty_length = HEADER.unpack_from(data)
+		if magic != MAGIC or version != VERSION:
+			raise ValueError("Not a recording, or made by an unsupported version")
+		offset = HEADER.size + difficulty_length
+		recording = Recording(data[HEADER.size:offset].decode(), seed, flags)
+		while offset < len(data):
+			mask = data[offset]
+			count, offset = read_varint(data, offset + 1)
+			recording.runs.append([mask, count])
+			recording.ticks += count
+		if recording.ticks != ticks:
+			raise ValueError("Recording is truncated")
+		return recording
+
+	def save(self, path: str):
+		"""Writes the recording to a file."""
+		with open(path, "wb") as file:
+			file.write(self.to_bytes())
+
+	@staticmethod
+	def load(path: str) -> "Recording":
+		"""Reads a recording from a file."""
+		with open(path, "rb") as file:
+			return Recording.from_bytes(file.read())
+
+
+def replay(recording: "Recording") -> dict:
+	"""Runs the recorded game at full speed without a display and returns Simulation.run's result."""
+	simulation = Simulation(recording.difficulty, recording.seed, swept=bool(recording.flags & SWEPT_COLLISIONS))
+	return simulation.run(recording.inputs(), recording.ticks)
+
+
+if __name__ == "__main__":
+	if len(sys.argv) != 2:
+		print(__doc__)
+		sys.exit(1)
+	recording = Recording.load(sys.argv[1])
+	result = replay(recording)
+	print(f"{recording.difficulty} seed {recording.seed}: score {result['score']} in {result['ticks']} ticks "
+		  f"({result['ticks_per_second']:.0f} ticks per second)")
@@ -0,0 +1,125 @@
+import threading
+import tkinter as tk
+from time import perf_counter, sleep
+from typing import Callable
+
+
+class FixedStepScheduler:
+	"""Runs a fixed-timestep simulation inside the Tkinter event loop.
+
+	The simulation advances in steps of step_time seconds no matter how long rendering takes,
+	while frames are rendered every frame_time seconds using Tkinter's after.
+	"""
+
+	def __init__(self, root: "tk.Tk", step: Callable[[], bool], render: Callable[[float], None],
+				 finish: Callable[[], None], step_time: float = 0.02, frame_time: float = 1 / 60, max_steps: int = 5):
+		"""Inits FixedStepScheduler.
+
+		step advances the simulation by one tick and returns False once it is over.
+		render draws a frame given how far (0 to 1) the current time is between the last two ticks.
+		finish is called once after the last step.
+		max_steps is the most ticks run before rendering a frame; time beyond that is dropped.
+		"""
+		self.root = root
+		self.step = step
+		self.render = render
+		self.finish = finish
+		self.step_time = step_time
+		self.frame_time = frame_time
+		self.max_steps = max_steps
+		self.accumulator = 0.0  # Time not yet simulated
+		self.last_time = None
+		self.after_id = None
+
+	def start(self):
+		"""Schedules the first frame."""
+		self.accumulator = 0.0
+		self.last_time = perf_counter()
+		self.after_id = self.root.after(0, self.tick)
+
+	def stop(self):
+		"""Cancels the next frame."""
+		if self.after_id is not None:
+			self.root.after_cancel(self.after_id)
+			self.after_id = None
+
+	def tick(self):
+		"""Runs every simulation step that is due, renders one frame, and schedules the next frame."""
+		frame_start = perf_counter()
+		self.accumulator += frame_start - self.last_time
+		self.last_time = frame_start
+
+		steps = 0
+		while self.accumulator >= self.step_time:
+			if steps == self.max_steps:
+				self.accumulator %= self.step_time  # Too far behind, skip the remaining steps
+				break
+			if not self.step():
+				self.after_id = None
+				self.finish()
+				return
+			self.accumulator -= self.step_time
+			steps += 1
+
+		self.render(self.accumulator / self.step_time)
+		delay = self.frame_time - (perf_counter() - frame_start)
+		self.after_id = self.root.after(max(1, int(delay * 1000)), self.tick)
+
+
+class ThreadedScheduler(FixedStepScheduler):
+	"""Runs a fixed-timestep simulation on its own thread while the Tkinter event loop only renders.
+
+	step runs on the simulation thread and must only hand results to render through values it replaces whole,
+	such as an immutable snapshot, so neither thread ever waits for the other.
+	"""
+
+	def __init__(self, root: "tk.Tk", step: Callable[[], bool], render: Callable[[float], None],
+				 finish: Callable[[], None], step_time: float = 0.02, frame_time: float = 1 / 60, max_steps: int = 5):
+		"""Inits ThreadedScheduler, which takes the same arguments as FixedStepScheduler."""
+		super().__init__(root, step, render, finish, step_time, frame_time, max_steps)
+		self.thread = None
+		self.stopped = threading.Event()
+		self.finished = False  # Set by the simulation thread after the last step
+		self.last_step_time = None  # When the latest step finished, used to interpolate frames
+
+	def start(self):
+		"""Starts the simulation thread and schedules the first frame."""
+		self.stopped.clear()
+		self.finished = False
+		self.last_step_time = perf_counter()
+		self.thread = threading.Thread(target=self.run_steps, daemon=True)
+		self.thread.start()
+		self.after_id = self.root.after(0, self.tick)
+
+	def stop(self):
+		"""Stops the simulation thread and cancels the next frame."""
+		self.stopped.set()
+		super().stop()
+
+	def run_steps(self):
+		"""Steps every step_time seconds until the simulation is over or stopped, catching up after delays."""
+		next_step = perf_counter()
+		while not self.stopped.is_set():
+			steps = 0
+			while perf_counter() >= next_step:
+				if steps == self.max_steps:
+					next_step = perf_counter()  # Too far behind, skip the remaining steps
+					break
+				if not self.step():
+					self.finished = True
+					return
+				self.last_step_time = perf_counter()
+				next_step += self.step_time
+				steps += 1
+			sleep(max(0.0, next_step - perf_counter()))
+
+	def tick(self):
+		"""Renders the latest step, or finishes once the simulation thread has, and schedules the next frame."""
+		frame_start = perf_counter()
+		if self.finished:
+			self.after_id = None
+			self.finish()
+			return
+		self.render(min(1.0, (frame_start - self.last_step_time) / self.step_time))
+		delay = self.frame_time - (perf_counter() - frame_start)
+		self.after_id = self.root.after(max(1, int(delay * 1000)), self.tick)
@@ -0,0 +1,39 @@
+import copy
+import json
+import os
+
+DEFAULT_SETTINGS = {
+	"leaderboard": {
+		"backend": "firestore",  # "firestore", "firestore_scores" (a document per score), or "sqlite"
+		"ttl": 60,  # Seconds before a cached leaderboard is read again
+		"subscribe": True,  # Receives leaderboard changes as they happen instead of reading them every ttl
+		"credentials": "config/service_creds.json",
+		"sqlite_path": "config/leaderboard.db",
+	},
+	"startup": {
+		"lazy_resources": True,  # Loads images when first drawn instead of before the first screen
+	},
+	"recording": {
+		"enabled": False,  # Saves the seed and keys pressed of every game so it can be replayed
+		"directory": "recordings",
+	},
+	"simulation": {
+		"threaded": True,  # Steps the simulation on its own thread instead of between frames on the Tk thread
+		"swept_collisions": True,  # Checks collisions over each tick's whole movement, so fast objects cannot tunnel
+	},
+	"profiler": {
+		"enabled": False,  # Times every phase of every frame
+		"overlay": True,  # Shows frames per second and phase percentiles next to the spaceship stats
+		"trace": "profile.csv",  # Written on exit, as JSON if the name ends in .json
+	},
+}
+
+
+def load_settings(path: str = "config/settings.json") -> dict:
+	"""Returns the default settings, overridden by any settings in the file at path."""
+	settings = copy.deepcopy(DEFAULT_SETTINGS)
+	if os.path.exists(path):
+		with open(path) as file:
+			for section, values in json.load(file).items():
+				settings.setdefault(section, {}).update(values)
+	return settings
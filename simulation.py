@@ -0,0 +1,243 @@
+import argparse
+import random
+from time import perf_counter
+from typing import Callable, Iterable, Set, Union
+from model import *
+from profiler import NullProfiler
+
+DIFFICULTIES = {
+	"easy": {"num_asteroids": 10, "base_hp": 5, "fuel_consumption": 0.2, "speed": (4, 6), "ramp": None,
+			 "leaderboard": True},
+	"medium": {"num_asteroids": 15, "base_hp": 4, "fuel_consumption": 0.2, "speed": (4, 6), "ramp": None,
+			   "leaderboard": True},
+	"hard": {"num_asteroids": 20, "base_hp": 3, "fuel_consumption": 0.25, "speed": (4, 6), "ramp": None,
+			 "leaderboard": True},
+	"endless": {"num_asteroids": 10, "base_hp": 5, "fuel_consumption": 0.2, "speed": (4, 6), "leaderboard": False,
+				"ramp": {"score_step": 2500, "asteroids": 2, "speed": 0.5, "max_asteroids": 80}},
+}  # Speeds are the range of leftward pixels per tick of new Driftables
+# A ramp raises the level every score_step points; each level adds asteroids, up to max_asteroids, and speed
+
+
+class Simulation:
+	"""Runs the game model without any view.
+
+	All randomness comes from a seeded random.Random, so a seed and the keys pressed each tick reproduce a game.
+	"""
+
+	def __init__(self, difficulty: str, seed: int = None, game_width: int = 800, game_height: int = 800,
+				 num_asteroids: int = None, vectorized: bool = False, pooling: bool = True,
+				 profiler: "NullProfiler" = None, overrides: dict = None, swept: bool = False):
+		"""Inits Simulation.
+
+		num_asteroids overrides the difficulty's asteroid count.
+		overrides replaces some of the difficulty's settings, such as base_hp or fuel_consumption.
+		vectorized stores asteroids in a NumPy AsteroidField instead of a list of AsteroidModels.
+		pooling recycles offscreen and destroyed Driftables instead of allocating new ones.
+		profiler, if given, times the move, collide, and drift phases of every tick.
+		swept checks collisions over each object's whole movement in a tick instead of only where it ends up,
+		so fast objects cannot pass through each other.
+		"""
+		self.rng = random.Random(seed)
+		self.seed = seed
+		self.difficulty = difficulty
+		self.game_width = game_width
+		self.game_height = game_height
+		self.num_asteroids = num_asteroids
+		self.overrides = overrides or {}
+		self.vectorized = vectorized
+		self.swept = swept
+		self.model = GameModel()
+		self.pool = DriftablePool(64 if pooling else 0)
+		self.profiler = profiler or NullProfiler()
+		self.spatial_hash = None  # Broad phase for asteroids stored as AsteroidModels
+		self.fuel_consumption = None
+		self.ticks = 0
+		self.set_initial_values(difficulty)
+
+	def generate_asteroid_model(self) -> "AsteroidModel":
+		"""Generates a new AsteroidModel."""
+		return self.pool.acquire(AsteroidModel, self.rng.randint(self.game_width, 2 * self.game_width),
+								 self.rng.randint(40, self.game_height - 40), self.rng.randint(20, 40),
+								 -self.rng.randint(self.min_speed, self.max_speed), 0)
+
+	def generate_powerup_model(self) -> "Driftable":
+		"""Generates a new power-up model, always a fuel power-up when fuel is low."""
+		if self.model["spaceship"].fuel < 40:
+			powerup_type = FuelPowerUpModel
+		else:
+			powerup_type = self.rng.choice([HpPowerUpModel, FuelPowerUpModel, ScorePowerUpModel])
+		return self.pool.acquire(powerup_type, self.game_width + 100, self.rng.randint(36, self.game_height - 36), 36,
+								 -self.rng.randint(self.min_speed, self.max_speed), 0)
+
+	def set_initial_values(self, difficulty: str):
+		"""Initializes models."""
+		settings = {**DIFFICULTIES[difficulty], **self.overrides}
+		self.fuel_consumption = settings["fuel_consumption"]
+		self.base_speed = settings["speed"]
+		self.min_speed, self.max_speed = self.base_speed
+		self.ramp = settings["ramp"]
+		self.level = 0
+		self.model["spaceship"] = SpaceshipModel(150, 400, 40, settings["base_hp"], 100)
+		num_asteroids = settings["num_asteroids"] if self.num_asteroids is None else self.num_asteroids
+		self.base_asteroids = num_asteroids
+		if self.vectorized:
+			from asteroid_field import AsteroidField  # NumPy is only needed for vectorized simulations
+			import numpy as np
+			self.model["asteroids"] = AsteroidField(num_asteroids, self.game_width, self.game_height,
+													np.random.default_rng(self.rng.getrandbits(64)),
+													(self.min_speed, self.max_speed))
+		else:
+			self.model["asteroids"] = [self.generate_asteroid_model() for i in range(num_asteroids)]
+			collidables = [self.model["spaceship"]] + self.model["asteroids"]
+			self.spatial_hash = SpatialHash(max(collidable.r for collidable in collidables), self.swept_margin())
+			for collidable in collidables:
+				self.spatial_hash.insert(collidable)
+		self.model["stats"] = self.model["spaceship"]
+		self.model["powerup"] = self.generate_powerup_model()
+
+	def swept_margin(self) -> float:
+		"""Returns how far the spaceship and a Driftable can move towards each other in a tick, if swept."""
+		if not self.swept:
+			return 0
+		return self.model["spaceship"].movement_speed * 2 ** 0.5 + self.max_speed
+
+	def add_asteroids(self, count: int):
+		"""Adds count new asteroids."""
+		if self.vectorized:
+			self.model["asteroids"].add(count)
+			return
+		for i in range(count):
+			asteroid = self.generate_asteroid_model()
+			self.model["asteroids"].append(asteroid)
+			self.spatial_hash.insert(asteroid)
+
+	def apply_ramp(self):
+		"""Raises the level when the score passes the next step, adding asteroids and speeding up new Driftables."""
+		level = self.model["spaceship"].score // self.ramp["score_step"]
+		if level == self.level:
+			return
+		self.level = level
+		speed_bonus = int(level * self.ramp["speed"])
+		self.min_speed, self.max_speed = (speed + speed_bonus for speed in self.base_speed)
+		if self.vectorized:
+			self.model["asteroids"].speed = (self.min_speed, self.max_speed)
+		elif self.swept:
+			self.spatial_hash.set_margin(self.swept_margin())
+		target = min(self.base_asteroids + level * self.ramp["asteroids"], self.ramp["max_asteroids"])
+		if target > len(self.model["asteroids"]):
+			self.add_asteroids(target - len(self.model["asteroids"]))
+
+	def step(self, keys_pressed: Set[str]) -> bool:
+		"""Runs all game functions for one tick.
+
+		Returns False without changing the model once the game is over.
+		"""
+		if self.model["spaceship"].hp <= 0 or "q" in keys_pressed:
+			return False
+
+		self.profiler.start()
+		self.model.save_positions()
+		if self.model["spaceship"].fuel > 0:
+			self.model["spaceship"].move(keys_pressed, self.game_width, self.game_height, self.fuel_consumption)
+		self.profiler.lap("move")
+
+		self.collide()
+		self.profiler.lap("collide")
+
+		if self.vectorized:
+			self.model["asteroids"].respawn(self.model["asteroids"].drift_all())
+		else:
+			offscreen_asteroids = Driftable.drift_all(self.model["asteroids"])
+			for i in offscreen_asteroids:
+				self.spatial_hash.remove(self.model["asteroids"][i])
+				self.pool.release(self.model["asteroids"][i])
+				self.model["asteroids"][i] = self.generate_asteroid_model()
+				self.spatial_hash.insert(self.model["asteroids"][i])
+		if Driftable.drift_all([self.model["powerup"]]):
+			self.pool.release(self.model["powerup"])
+			self.model["powerup"] = self.generate_powerup_model()
+		self.profiler.lap("drift")
+		self.model["spaceship"].score += 10
+		if self.ramp is not None:
+			self.apply_ramp()
+		self.ticks += 1
+		return True
+
+	def collide(self):
+		"""Checks the spaceship against nearby asteroids and the power-up."""
+		if self.vectorized:
+			self.model["asteroids"].collide(self.model["spaceship"], self.swept)
+		else:
+			for asteroid in self.spatial_hash.nearby(self.model["spaceship"]):
+				self.model["spaceship"].collided(asteroid, self.swept)
+		self.model["spaceship"].collided(self.model["powerup"], self.swept)
+
+	def run(self, inputs: Union[Callable[["Simulation"], Set[str]], Iterable[Set[str]]], max_ticks: int = None) -> dict:
+		"""Steps until the game is over, as fast as possible.
+
+		inputs is either a policy called with the simulation every tick, or a script of keys pressed per tick.
+		Keys stop being pressed when a script runs out.
+		Returns the final score, number of ticks, seconds taken, and ticks per second.
+		"""
+		if callable(inputs):
+			next_keys = lambda: inputs(self)
+		else:
+			script = iter(inputs)
+			next_keys = lambda: next(script, set())
+
+		start = perf_counter()
+		while (max_ticks is None or self.ticks < max_ticks) and self.step(next_keys()):
+			pass
+		seconds = perf_counter() - start
+		return {"score": self.model["spaceship"].score, "ticks": self.ticks, "seconds": seconds,
+				"ticks_per_second": self.ticks / seconds if seconds else float("inf")}
+
+
+def idle_policy(simulation: "Simulation") -> Set[str]:
+	"""Never presses any keys."""
+	return set()
+
+
+def random_policy(simulation: "Simulation") -> Set[str]:
+	"""Presses a random set of movement keys using the simulation's random number generator."""
+	return {key for key in "wasd" if simulation.rng.random() < 0.5}
+
+
+def dodge_policy(simulation: "Simulation") -> Set[str]:
+	"""Moves up or down away from the closest asteroid ahead of the spaceship in its lane."""
+	spaceship = simulation.model["spaceship"]
+	threat = None
+	for asteroid in simulation.model["asteroids"]:
+		ahead = asteroid.x + asteroid.r > spaceship.x - spaceship.r
+		in_lane = abs(asteroid.y - spaceship.y) < asteroid.r + spaceship.r + 10
+		if ahead and in_lane and (threat is None or asteroid.x < threat.x):
+			threat = asteroid
+	if threat is None:
+		return set()
+	return {"w"} if threat.y > spaceship.y else {"s"}
+
+
+POLICIES = {"idle": idle_policy, "random": random_policy, "dodge": dodge_policy}
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Runs games without a display and reports ticks per second.")
+	parser.add_argument("difficulty", choices=DIFFICULTIES)
+	parser.add_argument("--games", type=int, default=100)
+	parser.add_argument("--seed", type=int, default=0, help="seed of the first game, later games count up from it")
+	parser.add_argument("--policy", choices=POLICIES, default="random")
+	parser.add_argument("--max-ticks", type=int, default=None)
+	parser.add_argument("--asteroids", type=int, default=None, help="overrides the difficulty's asteroid count")
+	parser.add_argument("--vectorized", action="store_true", help="stores asteroids in NumPy arrays")
+	parser.add_argument("--swept", action="store_true", help="checks collisions over each tick's whole movement")
+	args = parser.parse_args()
+
+	total_ticks = 0
+	total_seconds = 0
+	for game in range(args.games):
+		simulation = Simulation(args.difficulty, args.seed + game, num_asteroids=args.asteroids,
+								vectorized=args.vectorized, swept=args.swept)
+		result = simulation.run(POLICIES[args.policy], args.max_ticks)
+		total_ticks += result["ticks"]
+		total_seconds += result["seconds"]
+		print(f"seed {args.seed + game}: score {result['score']} in {result['ticks']} ticks")
+	print(f"{total_ticks} ticks in {total_seconds:.3f} s ({total_ticks / total_seconds:.0f} ticks per second)")
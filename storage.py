@@ -0,0 +1,374 @@
+import bisect
+import hashlib
+import heapq
+import itertools
+import json
+import sqlite3
+import threading
+from abc import abstractmethod, ABCMeta
+from contextlib import closing
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+FIELDS = ("username", "score", "timestamp")  # Fields of an entry
+TIMESTAMP_FORMAT = "%Y/%m/%d %H:%M:%S.%f"  # Format for time: YYYY/MM/DD HH:MM:SS.MMMMMM
+
+
+class TransactionConflict(Exception):
+	"""Raised when committing a transaction whose documents were changed by someone else, so it can be retried."""
+	pass
+
+
+def sort_key(entry: dict) -> Tuple[int, str, str]:
+	"""Orders entries by highest score, then lowest time, then alphabetically."""
+	return -entry["score"], entry["timestamp"], entry["username"]
+
+
+def best_unique(entries: Iterable[dict], size: int) -> List[dict]:
+	"""Returns the best size entries, sorted by sort_key, keeping one of any entries with every field equal.
+
+	Entries are streamed, so no more than size are held at once.
+	"""
+	best = []
+	for entry in entries:
+		key = sort_key(entry)
+		if len(best) == size and key >= sort_key(best[-1]):
+			continue
+		i = bisect.bisect_left(best, key, key=sort_key)
+		if i < len(best) and sort_key(best[i]) == key:
+			continue  # The sort key holds every field, so an equal key is the same entry
+		best.insert(i, entry)
+		if len(best) > size:
+			best.pop()
+	return best
+
+
+class LeaderboardBackend(metaclass=ABCMeta):
+	"""Contains all engines that store leaderboards.
+
+	Entries are dicts with a username, score, and timestamp formatted so it sorts chronologically.
+	"""
+	stores_every_score = False  # Whether scores that do not make the leaderboard are kept too
+	pageable = False  # Whether page and personal_best reach past the leaderboard, so pages are worth showing
+
+	def __init__(self):
+		"""Inits LeaderboardBackend."""
+		self.subscribers = []
+		self.subscribers_lock = threading.Lock()
+
+	@abstractmethod
+	def read(self) -> Dict[str, List[dict]]:
+		"""Returns every difficulty's leaderboard, sorted by sort_key."""
+		pass
+
+	@abstractmethod
+	def insert(self, difficulty: str, entry: dict) -> bool:
+		"""Stores an entry and returns whether it made the leaderboard."""
+		pass
+
+	def bulk_insert(self, difficulty: str, entries: Iterable[dict]) -> int:
+		"""Stores many entries and returns how many were stored. By default they are inserted one at a time."""
+		return sum(self.insert(difficulty, entry) or self.stores_every_score for entry in entries)
+
+	def subscribe(self, callback: Callable[[Dict[str, List[dict]]], None]) -> Callable[[], None]:
+		"""Calls callback with every leaderboard now, and with the leaderboards that change whenever they do.
+
+		By default this is a local publisher that only sees inserts made through this backend, standing in for
+		databases that cannot push changes. Returns a function that cancels the subscription.
+		"""
+		with self.subscribers_lock:
+			self.subscribers.append(callback)
+		callback(self.read())
+
+		def unsubscribe():
+			"""Stops calling callback."""
+			with self.subscribers_lock:
+				self.subscribers.remove(callback)
+
+		return unsubscribe
+
+	def page(self, difficulty: str, after: dict, size: int = 10) -> List[dict]:
+		"""Returns up to size entries ranked right after after, the last entry of the previous page.
+
+		By default pages are cut from read, so only leaderboard entries can be browsed and pageable is False.
+		"""
+		return [entry for entry in self.read()[difficulty] if sort_key(entry) > sort_key(after)][:size]
+
+	def personal_best(self, difficulty: str, username: str) -> Optional[dict]:
+		"""Returns a player's highest ranked entry, or None. By default only leaderboard entries are searched."""
+		return next((entry for entry in self.read()[difficulty] if entry["username"] == username), None)
+
+	def publish(self, leaderboards: Dict[str, List[dict]]):
+		"""Calls every subscriber with leaderboards that changed."""
+		with self.subscribers_lock:
+			subscribers = list(self.subscribers)
+		for callback in subscribers:
+			callback(leaderboards)
+
+
+class FirestoreBackend(LeaderboardBackend):
+	"""Stores every leaderboard as an array of a fixed length in one Firestore document."""
+
+	def __init__(self, credentials_path: str = "config/service_creds.json", db: "firestore.Client" = None,
+				 transactional: Callable = None, size: int = 10):
+		"""Inits FirestoreBackend.
+
+		Creates connection to firestore database, unless a client such as memory_firestore.Client is given along
+		with its transactional decorator.
+		Stores a reference to leaderboard document.
+		"""
+		super().__init__()
+		if db is None:
+			db, transactional = connect_firestore(credentials_path)
+		self.db = db
+		self.transactional = transactional
+		self.doc_ref = self.db.collection("gsa").document("leaderboard")
+		self.size = size  # Number of entries in a leaderboard
+
+	def read(self) -> Dict[str, List[dict]]:
+		"""Reads the leaderboard document."""
+		return self.doc_ref.get().to_dict()
+
+	def subscribe(self, callback: Callable[[Dict[str, List[dict]]], None]) -> Callable[[], None]:
+		"""Listens to the leaderboard document, so callback also receives changes made by other players."""
+		watch = self.doc_ref.on_snapshot(lambda snapshots, changes, read_time: callback(snapshots[-1].to_dict()))
+		return watch.unsubscribe
+
+	def insert(self, difficulty: str, entry: dict) -> bool:
+		"""Inserts an entry in a transaction, so concurrent inserts are retried instead of overwriting each other."""
+
+		@self.transactional
+		def insert_entry(transaction) -> bool:
+			"""Inserts the entry in sorted position and removes the lowest score."""
+			leaderboard = self.doc_ref.get(transaction=transaction).to_dict()[difficulty]
+			if not leaderboard or sort_key(entry) >= sort_key(leaderboard[-1]):
+				return False
+			bisect.insort(leaderboard, entry, key=sort_key)
+			leaderboard.pop()  # Removes last entry in leaderboard, also known as the lowest score
+			transaction.update(self.doc_ref, {difficulty: leaderboard})
+			return True
+
+		return insert_entry(self.db.transaction())
+
+	def bulk_insert(self, difficulty: str, entries: Iterable[dict]) -> int:
+		"""Merges entries into the leaderboard in one transaction and returns how many made it.
+
+		Only the best size entries can make the leaderboard, so no more than that are kept while entries are read.
+		Entries already on the leaderboard are skipped, so importing the same scores again changes nothing.
+		"""
+		candidates = best_unique(entries, self.size)
+
+		@self.transactional
+		def merge_entries(transaction) -> int:
+			"""Merges the sorted new candidates with the sorted leaderboard, keeping its length."""
+			leaderboard = self.doc_ref.get(transaction=transaction).to_dict()[difficulty]
+			stored = {sort_key(entry) for entry in leaderboard}
+			new = [entry for entry in candidates if sort_key(entry) not in stored]
+			merged = list(itertools.islice(heapq.merge(leaderboard, new, key=sort_key), len(leaderboard)))
+			old = {id(entry) for entry in leaderboard}
+			added = sum(id(entry) not in old for entry in merged)
+			if added:
+				transaction.update(self.doc_ref, {difficulty: merged})
+			return added
+
+		return merge_entries(self.db.transaction())
+
+
+class FirestoreScoresBackend(LeaderboardBackend):
+	"""Stores every score as its own document in a Firestore collection, so writes never contend.
+
+	Leaderboards, pages, and personal bests are read with queries, which need these composite indexes on the
+	scores collection: difficulty, score descending, timestamp, username; and difficulty, username,
+	score descending, timestamp.
+	"""
+	stores_every_score = True
+	pageable = True
+
+	def __init__(self, credentials_path: str = "config/service_creds.json", db: "firestore.Client" = None,
+				 size: int = 10, difficulties: Tuple[str, ...] = ("easy", "medium", "hard")):
+		"""Inits FirestoreScoresBackend, connecting to Firestore unless a client is given."""
+		super().__init__()
+		if db is None:
+			db, transactional = connect_firestore(credentials_path)
+		self.db = db
+		self.scores = self.db.collection("gsa_scores")
+		self.size = size  # Number of entries in a leaderboard
+		self.difficulties = difficulties
+
+	@staticmethod
+	def entry(snapshot: "firestore.DocumentSnapshot") -> dict:
+		"""Returns the entry stored in a score document."""
+		data = snapshot.to_dict()
+		return {field: data[field] for field in FIELDS}
+
+	def ranked(self, difficulty: str) -> "firestore.Query":
+		"""Returns a query for a difficulty's scores in leaderboard order."""
+		return (self.scores.where("difficulty", "==", difficulty).order_by("score", direction="DESCENDING")
+				.order_by("timestamp").order_by("username"))
+
+	def read(self) -> Dict[str, List[dict]]:
+		"""Queries the top scores of every difficulty."""
+		return {difficulty: [self.entry(snapshot) for snapshot in self.ranked(difficulty).limit(self.size).stream()]
+				for difficulty in self.difficulties}
+
+	def page(self, difficulty: str, after: dict, size: int = 10) -> List[dict]:
+		"""Queries the scores ranked after after using it as a cursor, so earlier pages are never read."""
+		query = self.ranked(difficulty).start_after({field: after[field] for field in FIELDS}).limit(size)
+		return [self.entry(snapshot) for snapshot in query.stream()]
+
+	def personal_best(self, difficulty: str, username: str) -> Optional[dict]:
+		"""Queries a player's highest ranked score."""
+		query = (self.scores.where("difficulty", "==", difficulty).where("username", "==", username)
+				 .order_by("score", direction="DESCENDING").order_by("timestamp").limit(1))
+		return next((self.entry(snapshot) for snapshot in query.stream()), None)
+
+	def subscribe(self, callback: Callable[[Dict[str, List[dict]]], None]) -> Callable[[], None]:
+		"""Listens to the top scores query of every difficulty, so callback also receives other players' scores."""
+		watches = [self.ranked(difficulty).limit(self.size).on_snapshot(
+			lambda snapshots, changes, read_time, difficulty=difficulty: callback(
+				{difficulty: [self.entry(snapshot) for snapshot in snapshots]}))
+			for difficulty in self.difficulties]
+
+		def unsubscribe():
+			"""Stops every listener."""
+			for watch in watches:
+				watch.unsubscribe()
+
+		return unsubscribe
+
+	def insert(self, difficulty: str, entry: dict) -> bool:
+		"""Adds a score document, then checks whether fewer than size scores are ranked above it."""
+		self.scores.add({"difficulty": difficulty, **entry})
+		higher = self.ranked(difficulty).end_before({field: entry[field] for field in FIELDS}).limit(self.size)
+		return len(higher.get()) < self.size
+
+	@staticmethod
+	def score_id(difficulty: str, entry: dict) -> str:
+		"""Returns a document id made from every field of a score, so the same score always has the same id."""
+		fields = [difficulty] + [entry[field] for field in FIELDS]
+		return hashlib.sha256(json.dumps(fields).encode()).hexdigest()
+
+	def bulk_insert(self, difficulty: str, entries: Iterable[dict], batch_size: int = 500) -> int:
+		"""Sets a score document per entry in write batches of at most batch_size, the most Firestore allows.
+
+		Documents are named by score_id, so importing the same scores again rewrites them instead of adding
+		copies. Returns the number of documents written.
+		"""
+		stored = 0
+		entries = iter(entries)
+		while batch_entries := list(itertools.islice(entries, batch_size)):
+			batch = self.db.batch()
+			for entry in batch_entries:
+				batch.set(self.scores.document(self.score_id(difficulty, entry)), {"difficulty": difficulty, **entry})
+			batch.commit()
+			stored += len(batch_entries)
+		return stored
+
+
+class SQLiteBackend(LeaderboardBackend):
+	"""Stores every score in a local SQLite database, indexed so the top scores are read without sorting."""
+	stores_every_score = True
+	pageable = True
+
+	def __init__(self, path: str = "config/leaderboard.db", size: int = 10,
+				 difficulties: Tuple[str, ...] = ("easy", "medium", "hard")):
+		"""Inits SQLiteBackend, creating the database if it does not exist."""
+		super().__init__()
+		self.path = path
+		self.size = size  # Number of entries in a leaderboard
+		self.difficulties = difficulties
+		with closing(self.connect()) as connection, connection:
+			connection.execute("CREATE TABLE IF NOT EXISTS scores (difficulty TEXT NOT NULL, username TEXT NOT NULL, "
+							   "score INTEGER NOT NULL, timestamp TEXT NOT NULL)")
+			connection.execute("CREATE INDEX IF NOT EXISTS scores_rank ON scores "
+							   "(difficulty, score DESC, timestamp, username)")
+			connection.execute("CREATE INDEX IF NOT EXISTS scores_player ON scores "
+							   "(difficulty, username, score DESC, timestamp)")
+			if connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'scores_unique'").fetchone() is None:
+				connection.execute("DELETE FROM scores WHERE rowid NOT IN (SELECT MIN(rowid) FROM scores "
+								   "GROUP BY difficulty, username, score, timestamp)")  # Copies from earlier imports
+				connection.execute("CREATE UNIQUE INDEX scores_unique ON scores "
+								   "(difficulty, username, score, timestamp)")
+
+	def connect(self) -> "sqlite3.Connection":
+		"""Opens a connection, one per call so the backend can be used from any thread."""
+		connection = sqlite3.connect(self.path)
+		connection.row_factory = sqlite3.Row
+		return connection
+
+	def top(self, connection: "sqlite3.Connection", difficulty: str) -> List[dict]:
+		"""Returns a difficulty's leaderboard using the rank index."""
+		rows = connection.execute("SELECT username, score, timestamp FROM scores WHERE difficulty = ? "
+								  "ORDER BY score DESC, timestamp, username LIMIT ?", (difficulty, self.size))
+		return [dict(row) for row in rows]
+
+	def read(self) -> Dict[str, List[dict]]:
+		"""Reads the top scores of every difficulty."""
+		with closing(self.connect()) as connection:
+			return {difficulty: self.top(connection, difficulty) for difficulty in self.difficulties}
+
+	def page(self, difficulty: str, after: dict, size: int = 10) -> List[dict]:
+		"""Reads the scores ranked after after by seeking the rank index, so earlier pages are never read."""
+		with closing(self.connect()) as connection:
+			rows = connection.execute(
+				"SELECT username, score, timestamp FROM scores WHERE difficulty = ? AND (score < ? OR score = ? AND "
+				"(timestamp > ? OR timestamp = ? AND username > ?)) ORDER BY score DESC, timestamp, username LIMIT ?",
+				(difficulty, after["score"], after["score"], after["timestamp"], after["timestamp"], after["username"],
+				 size))
+			return [dict(row) for row in rows]
+
+	def personal_best(self, difficulty: str, username: str) -> Optional[dict]:
+		"""Reads a player's highest ranked score using the player index."""
+		with closing(self.connect()) as connection:
+			row = connection.execute("SELECT username, score, timestamp FROM scores WHERE difficulty = ? AND "
+									 "username = ? ORDER BY score DESC, timestamp LIMIT 1",
+									 (difficulty, username)).fetchone()
+		return None if row is None else dict(row)
+
+	def insert(self, difficulty: str, entry: dict) -> bool:
+		"""Stores a score, unless it is already stored, and counts the entries ranked above it."""
+		with closing(self.connect()) as connection, connection:
+			connection.execute("INSERT OR IGNORE INTO scores (difficulty, username, score, timestamp) "
+							   "VALUES (?, ?, ?, ?)",
+							   (difficulty, entry["username"], entry["score"], entry["timestamp"]))
+			higher, = connection.execute(
+				"SELECT COUNT(*) FROM (SELECT 1 FROM scores WHERE difficulty = ? AND (score > ? OR score = ? AND "
+				"(timestamp < ? OR timestamp = ? AND username < ?)) LIMIT ?)",
+				(difficulty, entry["score"], entry["score"], entry["timestamp"], entry["timestamp"], entry["username"],
+				 self.size)).fetchone()
+		if higher < self.size and self.subscribers:
+			with closing(self.connect()) as connection:
+				self.publish({difficulty: self.top(connection, difficulty)})
+		return higher < self.size
+
+	def bulk_insert(self, difficulty: str, entries: Iterable[dict]) -> int:
+		"""Stores every entry not already stored in one transaction, streaming them into the statement.
+
+		Returns the number of entries added.
+		"""
+		with closing(self.connect()) as connection, connection:
+			stored = connection.executemany(
+				"INSERT OR IGNORE INTO scores (difficulty, username, score, timestamp) VALUES (?, ?, ?, ?)",
+				((difficulty, entry["username"], entry["score"], entry["timestamp"]) for entry in entries)).rowcount
+		if self.subscribers:
+			with closing(self.connect()) as connection:
+				self.publish({difficulty: self.top(connection, difficulty)})
+		return stored
+
+
+def connect_firestore(credentials_path: str) -> Tuple["firestore.Client", Callable]:
+	"""Connects to the Firestore database and returns a client and its transactional decorator."""
+	import firebase_admin  # Only needed when using Firestore
+	from firebase_admin import credentials, firestore
+	firebase_admin.initialize_app(credentials.Certificate(credentials_path))
+	return firestore.client(), firestore.transactional
+
+
+def create_backend(settings: dict) -> "LeaderboardBackend":
+	"""Creates the leaderboard backend named in the leaderboard settings."""
+	if settings["backend"] == "firestore":
+		return FirestoreBackend(settings["credentials"])
+	if settings["backend"] == "firestore_scores":
+		return FirestoreScoresBackend(settings["credentials"])
+	if settings["backend"] == "sqlite":
+		return SQLiteBackend(settings["sqlite_path"])
+	raise ValueError(f"Unknown leaderboard backend: {settings['backend']}")
@@ -0,0 +1,129 @@
+import datetime as dt
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from time import sleep
+from uuid import uuid4
+from model import LeaderboardModel
+from storage import TransactionConflict
+
+logger = logging.getLogger(__name__)
+REQUIRED_KEYS = ("id", "difficulty", "username", "score", "timestamp")  # Keys of every pending score
+TRANSIENT_ERRORS = (ConnectionError, TimeoutError, TransactionConflict)  # Errors worth retrying a score after
+try:
+	from google.api_core import exceptions as google_exceptions  # Only installed along with Firestore
+	TRANSIENT_ERRORS += (google_exceptions.ServiceUnavailable, google_exceptions.DeadlineExceeded,
+						 google_exceptions.Aborted, google_exceptions.InternalServerError,
+						 google_exceptions.TooManyRequests)
+except ImportError:
+	pass
+
+
+class ScoreSubmitter:
+	"""Submits scores to the leaderboard on a worker thread.
+
+	Every score is written to a JSON lines file before it is sent and removed once the leaderboard accepts it,
+	so scores that could not be sent are retried with backoff and sent again the next time the game starts.
+	Only transient errors are retried. Scores that fail for any other reason would fail forever and hold up
+	every score after them, so they are moved to a rejected file instead.
+	"""
+
+	def __init__(self, leaderboard: "LeaderboardModel", path: str = "config/pending_scores.jsonl",
+				 max_delay: float = 60, rejected_path: str = "config/rejected_scores.jsonl"):
+		"""Inits ScoreSubmitter and starts sending scores left over from earlier runs."""
+		self.leaderboard = leaderboard
+		self.path = path
+		self.rejected_path = rejected_path
+		self.max_delay = max_delay  # Longest wait in seconds between attempts to send a score
+		self.file_lock = threading.Lock()
+		self.pending = queue.Queue()
+		with self.file_lock:
+			for entry in self.read_pending():
+				self.pending.put(entry)
+		threading.Thread(target=self.worker, daemon=True).start()
+
+	def read_pending(self) -> list:
+		"""Returns the scores in the pending file, skipping any line cut short by a crash or missing a key.
+
+		Callers must hold file_lock.
+		"""
+		entries = []
+		if os.path.exists(self.path):
+			with open(self.path) as file:
+				for line in file:
+					try:
+						entry = json.loads(line)
+					except json.JSONDecodeError:
+						continue
+					if isinstance(entry, dict) and all(key in entry for key in REQUIRED_KEYS):
+						entries.append(entry)
+		return entries
+
+	def submit(self, difficulty: str, username: str, score: int):
+		"""Saves a score to the pending file and queues it to be sent without waiting for it."""
+		entry = {"id": uuid4().hex, "difficulty": difficulty, "username": username, "score": score,
+				 "timestamp": dt.datetime.now().strftime(self.leaderboard.datetime_format)}
+		with self.file_lock:
+			with open(self.path, "a") as file:
+				file.write(json.dumps(entry) + "\n")
+				file.flush()
+				os.fsync(file.fileno())
+		self.pending.put(entry)
+
+	def remove(self, entry_id: str):
+		"""Removes a sent score from the pending file."""
+		with self.file_lock:
+			entries = [entry for entry in self.read_pending() if entry["id"] != entry_id]
+			with open(f"{self.path}.tmp", "w") as file:
+				file.writelines(json.dumps(entry) + "\n" for entry in entries)
+				file.flush()
+				os.fsync(file.fileno())
+			os.replace(f"{self.path}.tmp", self.path)  # Replaces the file in one step so a crash cannot corrupt it
+
+	def reject(self, entry: dict, error: Exception):
+		"""Logs a score that can never be sent and appends it to the rejected file."""
+		logger.warning("Rejected score %s: %r", json.dumps(entry), error)
+		with self.file_lock:
+			with open(self.rejected_path, "a") as file:
+				file.write(json.dumps({**entry, "error": repr(error)}) + "\n")
+				file.flush()
+				os.fsync(file.fileno())
+
+	@staticmethod
+	def is_transient(error: Exception) -> bool:
+		"""Returns whether sending a score again could succeed after an error.
+
+		Missing files, denied permissions, and databases that cannot be opened never recover by themselves, so
+		only connection and timeout errors, transaction conflicts, and locked SQLite databases are retried.
+		"""
+		if isinstance(error, sqlite3.OperationalError):
+			return "locked" in str(error)  # "database is locked" or "database table is locked"
+		return isinstance(error, TRANSIENT_ERRORS)
+
+	def send(self, entry: dict) -> bool:
+		"""Sends a score to the leaderboard, retrying transient errors with exponential backoff until it succeeds.
+
+		Returns False without retrying if the score fails for any other reason.
+		"""
+		delay = 1
+		while True:
+			try:
+				self.leaderboard.update(entry["difficulty"], entry["username"], entry["score"],
+										dt.datetime.strptime(entry["timestamp"], self.leaderboard.datetime_format))
+				return True
+			except Exception as error:
+				if not self.is_transient(error):
+					self.reject(entry, error)
+					return False
+				sleep(delay)
+				delay = min(delay * 2, self.max_delay)
+
+	def worker(self):
+		"""Sends queued scores one at a time, forever."""
+		while True:
+			entry = self.pending.get()
+			self.send(entry)
+			self.remove(entry["id"])
@@ -0,0 +1,58 @@
+"""Tests how many hits the discrete collision check misses, and that the swept checks agree with each other.
+
+Run with: python -m unittest test_collision
+"""
+import random
+import unittest
+import numpy as np
+from asteroid_field import AsteroidField
+from benchmark import HitCountingSimulation, immortal_policy
+from model import AsteroidModel, SpaceshipModel
+
+
+def count_hits(scale: int, ticks: int = 5000) -> dict:
+	"""Plays a seeded game of hard with Driftables scale times as fast as in the game and counts its hits."""
+	simulation = HitCountingSimulation("hard", 0, overrides={"speed": (4 * scale, 6 * scale)}, swept=True)
+	simulation.run(immortal_policy, ticks)
+	return simulation.hits
+
+
+class TunnelingTest(unittest.TestCase):
+	"""Compares the discrete and swept collision checks over whole games."""
+
+	def test_game_speeds_miss_no_hits(self):
+		"""At the game's speeds, the discrete check finds every hit the swept check does."""
+		hits = count_hits(1)
+		self.assertGreater(hits["swept"], 0)
+		self.assertEqual(hits["missed"], 0)
+
+	def test_fast_driftables_tunnel_through_the_discrete_check(self):
+		"""At 8 and 16 times the game's speeds, the discrete check misses hits that the swept check finds."""
+		for scale in (8, 16):
+			with self.subTest(scale=scale):
+				hits = count_hits(scale)
+				self.assertGreaterEqual(hits["swept"], hits["discrete"])
+				self.assertGreater(hits["missed"], 0)
+
+
+class SweptCollisionTest(unittest.TestCase):
+	"""Checks AsteroidField's vectorized swept check against Collidable.swept_touches."""
+
+	def test_asteroid_field_matches_swept_touches(self):
+		"""Both find the same hits over random spaceship and asteroid movements."""
+		rng = random.Random(0)
+		for case in range(3000):
+			field = AsteroidField(1, 1280, 960, np.random.default_rng(case), speed=(4, 96))
+			asteroid = field[0]
+			asteroid.x = field.x[0] = rng.uniform(0, 400)
+			asteroid.y = field.y[0] = rng.uniform(0, 400)
+			spaceship = SpaceshipModel(rng.uniform(100, 300), rng.uniform(100, 300), 25, 9, 100)
+			spaceship.prev_x = spaceship.x + rng.uniform(-30, 30)
+			spaceship.prev_y = spaceship.y + rng.uniform(-30, 30)
+			expected = spaceship.swept_touches(asteroid)
+			with self.subTest(case=case):
+				self.assertEqual(field.collide(spaceship, swept=True), int(expected))
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,85 @@
+"""Tests the transactional leaderboard against the in-memory Firestore stand-in.
+
+Run with: python -m unittest test_leaderboard
+"""
+import datetime as dt
+import threading
+import unittest
+import memory_firestore
+from model import LeaderboardModel
+from storage import FirestoreBackend, sort_key
+
+DIFFICULTIES = ("easy", "medium", "hard")
+
+
+def make_document(size: int = 10) -> dict:
+	"""Returns a leaderboard document whose every difficulty is full of low scores."""
+	return {difficulty: [{"username": f"seed{i}", "score": 100 - i, "timestamp": f"2022/01/01 00:00:00.{i:06d}"}
+						 for i in range(size)] for difficulty in DIFFICULTIES}
+
+
+class LeaderboardTest(unittest.TestCase):
+	"""Submits scores through LeaderboardModel to a FirestoreBackend on memory_firestore.Client."""
+
+	def setUp(self):
+		"""Creates a database with full leaderboards and a model with them cached."""
+		self.db = memory_firestore.Client({"gsa/leaderboard": make_document()})
+		self.backend = FirestoreBackend(db=self.db, transactional=memory_firestore.transactional)
+		self.model = LeaderboardModel(lambda: self.backend)
+		self.model.get("hard")  # Waits for the first read to be cached
+
+	def read(self, difficulty: str) -> list:
+		"""Returns a leaderboard straight from the database, without counting the read."""
+		return self.db.documents["gsa/leaderboard"][0][difficulty]
+
+	def test_concurrent_submissions_land_in_sort_order(self):
+		"""Every concurrent high score is kept, and the leaderboard stays sorted."""
+		scores = [1000 + 10 * i for i in range(8)]
+		start = threading.Barrier(len(scores))
+		results = {}
+
+		def submit(score: int):
+			"""Submits a score once every thread is ready."""
+			start.wait()
+			results[score] = self.model.update("hard", f"player{score}", score, dt.datetime(2022, 1, 2))
+
+		threads = [threading.Thread(target=submit, args=(score,)) for score in scores]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+
+		leaderboard = self.read("hard")
+		self.assertTrue(all(results.values()))
+		self.assertEqual(leaderboard, sorted(leaderboard, key=sort_key))
+		self.assertEqual([entry["score"] for entry in leaderboard[:len(scores)]], sorted(scores, reverse=True))
+
+	def test_score_that_cannot_place_is_rejected_without_reads(self):
+		"""A score below the cached lowest score is rejected without contacting the database."""
+		reads, writes = self.db.reads, self.db.writes
+		self.assertFalse(self.model.update("hard", "player", 1))
+		self.assertEqual(self.db.reads, reads)
+		self.assertEqual(self.db.writes, writes)
+
+	def test_leaderboard_length_is_preserved(self):
+		"""Inserting high scores pushes the lowest ones off instead of growing the leaderboard."""
+		for score in (500, 400, 95):
+			self.assertTrue(self.model.update("medium", "player", score))
+		leaderboard = self.read("medium")
+		self.assertEqual(len(leaderboard), 10)
+		self.assertEqual([entry["score"] for entry in leaderboard[:3]], [500, 400, 100])
+		self.assertNotIn(91, [entry["score"] for entry in leaderboard])
+
+	def test_bulk_insert_skips_stored_and_repeated_entries(self):
+		"""Importing the same scores twice, with copies among them, adds each score to the leaderboard once."""
+		entries = [{"username": f"player{i}", "score": 1000 - i, "timestamp": "2022/01/02 00:00:00.000000"}
+				   for i in range(4)]
+		self.assertEqual(self.backend.bulk_insert("easy", entries + entries[:2]), 4)
+		self.assertEqual(self.backend.bulk_insert("easy", entries), 0)
+		leaderboard = self.read("easy")
+		self.assertEqual(leaderboard[:4], entries)
+		self.assertEqual(len({tuple(entry.values()) for entry in leaderboard}), 10)
+
+
+if __name__ == "__main__":
+	unittest.main()
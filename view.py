@@ -1,17 +1,154 @@
 from model import *
+import hashlib
+import json
 import tkinter as tk
-from os import listdir
+from os import listdir, makedirs
+from os.path import exists
 from random import randint
 from abc import abstractmethod, ABCMeta
-from typing import List
+from typing import Callable, List, Optional, Tuple
+
+
+class Resources(dict):
+	"""Dictionary of Tkinter PhotoImages keyed by file name that loads each image the first time it is used."""
+
+	def __init__(self, directory: str):
+		"""Inits Resources for the images in directory."""
+		super().__init__()
+		self.directory = directory
+
+	def __missing__(self, file_name: str) -> "tk.PhotoImage":
+		"""Loads, stores, and returns an image that has not been used yet."""
+		self[file_name] = tk.PhotoImage(file=f"{self.directory}/{file_name}")
+		return self[file_name]
+
+
+class SpriteAtlas(dict):
+	"""Dictionary of Tkinter PhotoImages of sprites composited from several resources, keyed by sprite name.
+
+	Sprites are composited and packed side by side into one atlas image the first time one is used. The atlas is
+	cached on disk as a PNG with a JSON index, keyed by a hash of the resources it was made from, so later starts
+	decode one image instead of every layer.
+	"""
+	sprites = {  # Layers of each sprite from bottom to top, centered on each other
+		"hp_powerup": ("heart.gif", "bubble.png"),
+		"fuel_powerup": ("lightning.png", "bubble.png"),
+		"score_powerup": ("fish.png", "bubble.png")}
+
+	def __init__(self, resources: "Resources", cache_directory: str):
+		"""Inits SpriteAtlas, which composites sprites from resources."""
+		super().__init__()
+		self.resources = resources
+		self.cache_directory = cache_directory
+
+	def __missing__(self, name: str) -> "tk.PhotoImage":
+		"""Loads every sprite, since they share one atlas, and returns one."""
+		self.load()
+		return super().__getitem__(name)
+
+	def source_hash(self) -> str:
+		"""Returns a hash of the sprite layouts and the contents of every layer."""
+		digest = hashlib.sha256(json.dumps(self.sprites, sort_keys=True).encode())
+		for file_name in sorted({layer for layers in self.sprites.values() for layer in layers}):
+			with open(f"{self.resources.directory}/{file_name}", "rb") as file:
+				digest.update(file.read())
+		return digest.hexdigest()
+
+	def load(self):
+		"""Slices every sprite out of the cached atlas, building the atlas first if the cache is missing or stale."""
+		atlas_path = f"{self.cache_directory}/sprites.png"
+		index_path = f"{self.cache_directory}/sprites.json"
+		source_hash = self.source_hash()
+		try:
+			with open(index_path) as file:
+				index = json.load(file)
+		except (OSError, ValueError):
+			index = None
+		if index is not None and index["hash"] == source_hash and exists(atlas_path):
+			atlas = tk.PhotoImage(file=atlas_path)
+		else:
+			atlas, index = self.build(source_hash)
+			makedirs(self.cache_directory, exist_ok=True)
+			atlas.write(atlas_path, format="png")
+			with open(index_path, "w") as file:
+				json.dump(index, file)
+		for name, (x, y, width, height) in index["sprites"].items():
+			sprite = tk.PhotoImage()
+			sprite.tk.call(sprite, "copy", atlas, "-from", x, y, x + width, y + height)
+			self[name] = sprite
+
+	def build(self, source_hash: str) -> Tuple["tk.PhotoImage", dict]:
+		"""Composites every sprite into a new atlas image and returns it with the position and size of each sprite."""
+		sizes = {name: (max(self.resources[layer].width() for layer in layers),
+						max(self.resources[layer].height() for layer in layers))
+				 for name, layers in self.sprites.items()}
+		atlas = tk.PhotoImage(width=sum(width for width, height in sizes.values()),
+							  height=max(height for width, height in sizes.values()))
+		index = {"hash": source_hash, "sprites": {}}
+		x = 0
+		for name, layers in self.sprites.items():
+			width, height = sizes[name]
+			for layer in layers:
+				image = self.resources[layer]
+				atlas.tk.call(atlas, "copy", image, "-to", x + (width - image.width()) // 2,
+							  (height - image.height()) // 2, "-compositingrule", "overlay")
+			index["sprites"][name] = (x, 0, width, height)
+			x += width
+		return atlas, index
+
+
+class CountingCanvas(tk.Canvas):
+	"""Canvas that counts the item operations sent to Tk, so the cost of drawing a frame can be measured."""
+
+	def __init__(self, *args, **kwargs):
+		"""Inits CountingCanvas."""
+		super().__init__(*args, **kwargs)
+		self.operations = 0
+
+	def pop_operations(self) -> int:
+		"""Returns the number of operations since the last call and starts counting again."""
+		operations, self.operations = self.operations, 0
+		return operations
+
+	def _create(self, *args, **kwargs) -> int:
+		"""Counts and creates an item; every create_ method calls this."""
+		self.operations += 1
+		return super()._create(*args, **kwargs)
+
+	def coords(self, *args):
+		"""Counts and reads or sets the coordinates of an item."""
+		self.operations += 1
+		return super().coords(*args)
+
+	def itemconfigure(self, *args, **kwargs):
+		"""Counts and configures an item."""
+		self.operations += 1
+		return super().itemconfigure(*args, **kwargs)
+
+	itemconfig = itemconfigure
+
+	def move(self, *args):
+		"""Counts and moves an item."""
+		self.operations += 1
+		return super().move(*args)
+
+	def delete(self, *args):
+		"""Counts and deletes items."""
+		self.operations += 1
+		return super().delete(*args)
 
 
 class GameView:
 	"""Stores all game views."""
-	resources = {}  # Static dictionary of Tkinter PhotoImages
+	resources = Resources("resources")  # Static dictionary of Tkinter PhotoImages
+	sprites = SpriteAtlas(resources, "cache")  # Static dictionary of composited Tkinter PhotoImages
 
-	def __init__(self):
-		"""Inits GameView."""
+	def __init__(self, lazy_resources: bool = True, screen: "tk.Canvas" = None):
+		"""Inits GameView.
+
+		Unless lazy_resources is set, every image is loaded up front instead of when it is first drawn.
+		A stand-in for the Canvas can be given as screen, in which case no window is opened.
+		"""
 		self.object_views = {}
 		self.screen_width = 800
 		self.screen_height = 900
@@ -19,14 +156,19 @@ class GameView:
 		self.game_height = 800
 		self.background = "black"
 
-		self.root = tk.Tk()
-		self.root.title("Gus' Space Adventure")
-		self.root.minsize(self.screen_width, self.screen_height)
-		self.screen = tk.Canvas(self.root, width=self.screen_width, height=self.screen_height,
-								background=self.background)
-		self.screen.pack()
+		if screen is None:
+			self.root = tk.Tk()
+			self.root.title("Gus' Space Adventure")
+			self.root.minsize(self.screen_width, self.screen_height)
+			screen = CountingCanvas(self.root, width=self.screen_width, height=self.screen_height,
+									background=self.background)
+			screen.pack()
+		else:
+			self.root = None
+		self.screen = screen
 
-		self.load_resources()
+		if not lazy_resources:
+			self.load_resources()
 		self.menu = Menu(self.screen)  # Creates instance of Menu object
 
 	def __setitem__(self, key: str, value: "ObjectView"):
@@ -38,24 +180,34 @@ class GameView:
 		return self.object_views[item]
 
 	def load_resources(self):
-		"""Adds Tkinter PhotoImages to GameView.resources.
+		"""Adds Tkinter PhotoImages to GameView.resources and GameView.sprites.
 
-		Automatically creates a Tkinter PhotoImage for every file in resources and assigns it a key.
+		Automatically creates a Tkinter PhotoImage for every file in resources and assigns it a key. Files that
+		are only layers of sprites are skipped, since the sprite atlas replaces them, but layers that views also
+		draw on their own are still loaded.
+		"""
+		GameView.sprites.load()
+		layers = {layer for layers in SpriteAtlas.sprites.values() for layer in layers}
+		layers -= set(SpaceshipStatsView.resources)
+		for file_name in listdir(GameView.resources.directory):
+			if file_name not in layers:
+				GameView.resources[file_name]  # Loads the image
+
+	def draw_all(self, game_model: "Mapping[str, object]", alpha: float = 1.0):
+		"""Draws all views using models, or a snapshot of them from GameModel.snapshot.
+
+		Views keep their canvas items between calls, so calling this every frame only moves them.
+		Positions are interpolated a fraction alpha of the way through the current tick.
 		"""
-		for file_name in listdir("resources"):
-			GameView.resources[file_name] = tk.PhotoImage(file=f"resources/{file_name}")
-
-	def draw_all(self, game_model: "GameModel"):
-		"""Draws all views using models."""
 		for obj in self.object_views:
 			if type(self.object_views[obj]) == list:
 				for i in range(len(self.object_views[obj])):
-					self.object_views[obj][i].draw(game_model[obj][i])
+					self.object_views[obj][i].draw(game_model[obj][i], alpha)
 			else:
-				self.object_views[obj].draw(game_model[obj])
+				self.object_views[obj].draw(game_model[obj], alpha)
 
 	def delete_all(self):
-		"""Deletes all views."""
+		"""Deletes all views, so the next draw_all recreates every canvas item."""
 		for obj in self.object_views:
 			if type(self.object_views[obj]) == list:
 				for i in range(len(self.object_views[obj])):
@@ -68,29 +220,142 @@ class GameView:
 		self.screen.update()
 
 
+class Button:
+	"""Button on a menu screen and the name of the action it triggers when clicked.
+
+	Buttons show an image from resources, or a text label in an outlined box the size of the image buttons.
+	"""
+
+	def __init__(self, resource: str, position: Callable[[int, int], Tuple[int, int]], action: str,
+				 text: str = None):
+		"""Inits Button.
+
+		position maps the width and height of the Canvas to the center of the button.
+		resource is None for a text button.
+		"""
+		self.resource = resource
+		self.position = position
+		self.action = action
+		self.text = text
+		self.size = (228, 72)  # Size of text buttons, matching the image buttons
+
+
+class Screen:
+	"""Layout of a menu screen: its buttons and other images."""
+
+	def __init__(self, buttons: List["Button"], images: List[Tuple[str, Callable[[int, int], Tuple[int, int]]]] = ()):
+		"""Inits Screen."""
+		self.buttons = buttons
+		self.images = images  # Resource names and positions of images that are not buttons
+
+
+SCREENS = {
+	"menu": Screen([Button("quit_button", lambda w, h: (w - 150, h - 75), "quit"),
+					Button("play_button", lambda w, h: (w // 2, 400), "levels"),
+					Button("instructions_button", lambda w, h: (w // 2, 500), "instructions"),
+					Button("leaderboard_button", lambda w, h: (w // 2, 600), "leaderboard")],
+				   [("title.png", lambda w, h: (w // 2, 200))]),
+	"levels": Screen([Button("main_menu_button", lambda w, h: (150, 100), "menu"),
+					  Button("easy_button", lambda w, h: (w // 2, 400), "start easy"),
+					  Button("medium_button", lambda w, h: (w // 2, 500), "start medium"),
+					  Button("hard_button", lambda w, h: (w // 2, 600), "start hard"),
+					  Button(None, lambda w, h: (w // 2, 700), "start endless", "Endless")]),
+	"instructions": Screen([Button("main_menu_button", lambda w, h: (150, 100), "menu")],
+						   [("instructions_page.png", lambda w, h: (w // 2, 475))]),
+	"leaderboard": Screen([Button("main_menu_button", lambda w, h: (150, 100), "menu"),
+						   Button("easy_button", lambda w, h: (w // 2, 400), "easy leaderboard"),
+						   Button("medium_button", lambda w, h: (w // 2, 500), "medium leaderboard"),
+						   Button("hard_button", lambda w, h: (w // 2, 600), "hard leaderboard")]),
+	"easy leaderboard": Screen([Button("leaderboard_button", lambda w, h: (150, 100), "leaderboard")]),
+	"medium leaderboard": Screen([Button("leaderboard_button", lambda w, h: (150, 100), "leaderboard")]),
+	"hard leaderboard": Screen([Button("leaderboard_button", lambda w, h: (150, 100), "leaderboard")]),
+	"game_over": Screen([Button("main_menu_button", lambda w, h: (w // 2, 500), "menu")]),
+}  # Menu screens by name, also the names of the actions that show them
+PREVIOUS_PAGE_BUTTON = Button(None, lambda w, h: (w // 2 - 130, 790), "previous page", "Previous")
+NEXT_PAGE_BUTTON = Button(None, lambda w, h: (w // 2 + 130, 790), "next page", "Next")
+
+
 class Menu:
 	"""All views not directly related to the running game."""
 
 	def __init__(self, screen: "tk.Canvas"):
 		"""Inits Menu."""
 		self.screen = screen
-		self.button_pos = {}  # Stores the x, y coordinates of the center of buttons
-		self.current_display = None  # Saves what screen is currently being displayed to be used by click handler.
+		self.current_display = None  # Saves what screen is currently being displayed.
 		self.username = None
+		self.background_drawn = False
+		self.hit_cell_size = 100
+		self.hit_cells = {}  # Maps grid cells to the bounding boxes and actions of buttons that overlap them
+		self.score_rows = []  # Rank, username, and score text items of each leaderboard row shown
+		self.page_size = 10  # Leaderboard rows per page
+		self.page_difficulty = None  # Difficulty of the leaderboard being paged through
+		self.page_cursors = []  # Last entry of each page before the one shown, to read the pages after them
+		self.page_entries = []  # Entries of the page shown
+		self.first_rank = 1  # Rank of the first row of the page shown
+		self.personal_best_text = None  # Text item showing the player's best score
 
 	def clear(self):
-		"""Clears the Canvas"""
-		self.screen.delete("all")
+		"""Clears the Canvas, only hiding the background so it can be shown again."""
+		self.screen.delete("!background")
+		self.screen.itemconfig("background", state="hidden")
 		self.current_display = None
+		self.hit_cells = {}
+		self.score_rows = []
+		self.personal_best_text = None
+
+	def add_hitbox(self, x0: int, y0: int, x1: int, y1: int, action: str):
+		"""Registers a button's bounding box in every grid cell it overlaps."""
+		for column in range(x0 // self.hit_cell_size, x1 // self.hit_cell_size + 1):
+			for row in range(y0 // self.hit_cell_size, y1 // self.hit_cell_size + 1):
+				self.hit_cells.setdefault((column, row), []).append((x0, y0, x1, y1, action))
+
+	def button_at(self, x: int, y: int) -> Optional[str]:
+		"""Returns the action of the button at x, y, or None if there is none."""
+		for x0, y0, x1, y1, action in self.hit_cells.get((x // self.hit_cell_size, y // self.hit_cell_size), ()):
+			if x0 <= x <= x1 and y0 <= y <= y1:
+				return action
+		return None
+
+	def draw_screen(self, name: str):
+		"""Clears the Canvas and draws a screen from SCREENS, precomputing the bounding boxes of its buttons."""
+		self.clear()
+		self.current_display = name
+		self.draw_background()
+		width, height = int(self.screen["width"]), int(self.screen["height"])
+		for resource, position in SCREENS[name].images:
+			self.screen.create_image(*position(width, height), image=GameView.resources[resource], anchor="center")
+		for button in SCREENS[name].buttons:
+			self.draw_button(button)
+
+	def draw_button(self, button: "Button"):
+		"""Draws a button and registers its bounding box."""
+		x, y = button.position(int(self.screen["width"]), int(self.screen["height"]))
+		if button.resource is None:
+			width_offset, height_offset = button.size[0] // 2, button.size[1] // 2
+			self.screen.create_rectangle(x - width_offset, y - height_offset, x + width_offset, y + height_offset,
+										 fill="black", outline="white", width=2)
+			self.screen.create_text(x, y, text=button.text, font="Helvetica 20", fill="white")
+		else:
+			image = GameView.resources[f"{button.resource}.png"]
+			self.screen.create_image(x, y, image=image, anchor="center")
+			width_offset, height_offset = image.width() // 2, image.height() // 2
+		self.add_hitbox(x - width_offset, y - height_offset, x + width_offset, y + height_offset, button.action)
 
 	def draw_background(self):
-		"""Draws stars and copyright text."""
+		"""Draws stars and copyright text.
+
+		They are created once, tagged "background", and shown again by later calls.
+		"""
+		if self.background_drawn:
+			self.screen.itemconfig("background", state="normal")
+			return
 		for i in range(100):
 			a = randint(0, int(self.screen["width"]))
 			b = randint(0, int(self.screen["height"]))
-			self.screen.create_oval(a - 1, b - 1, a + 1, b + 1, fill="yellow", outline="yellow")
+			self.screen.create_oval(a - 1, b - 1, a + 1, b + 1, fill="yellow", outline="yellow", tags="background")
 		self.screen.create_text(15, int(self.screen["height"]) - 15, text="Steven Chen © 2022. All rights reserved.",
-								font="Helvetica 14", fill="white", anchor="sw")
+								font="Helvetica 14", fill="white", anchor="sw", tags="background")
+		self.background_drawn = True
 
 	def draw_username_input(self, root: "tk.Tk"):
 		"""Draws username input screen."""
@@ -124,138 +389,148 @@ class Menu:
 
 	def draw_menu(self):
 		"""Draws main menu screen."""
-		self.clear()
-		self.current_display = "menu"
-		self.draw_background()
-		self.button_pos["quit_button"] = int(self.screen["width"]) - 150, int(self.screen["height"]) - 75
-		self.quit_button = self.screen.create_image(*self.button_pos["quit_button"],
-													image=GameView.resources["quit_button.png"], anchor="center")
-		self.title = self.screen.create_image(int(self.screen["width"]) // 2, 200,
-											  image=GameView.resources["title.png"], anchor="center")
-		self.button_pos["play_button"] = (int(self.screen["width"]) // 2, 400)
-		self.play_button = self.screen.create_image(*self.button_pos["play_button"],
-													image=GameView.resources["play_button.png"], anchor="center")
-		self.button_pos["instructions_button"] = (int(self.screen["width"]) // 2, 500)
-		self.instructions_button = self.screen.create_image(*self.button_pos["instructions_button"],
-															image=GameView.resources["instructions_button.png"],
-															anchor="center")
-		self.button_pos["leaderboard_button"] = (int(self.screen["width"]) // 2, 600)
-		self.leaderboard_button = self.screen.create_image(*self.button_pos["leaderboard_button"],
-														   image=GameView.resources["leaderboard_button.png"],
-														   anchor="center")
+		self.draw_screen("menu")
 
 	def draw_levels(self):
 		"""Draws difficulty selection screen."""
-		self.clear()
-		self.current_display = "levels"
-		self.draw_background()
-		self.button_pos["main_menu_button"] = (150, 100)
-		self.main_menu_button = self.screen.create_image(*self.button_pos["main_menu_button"],
-														 image=GameView.resources["main_menu_button.png"],
-														 anchor="center")
-		self.button_pos["easy_button"] = (int(self.screen["width"]) // 2, 400)
-		self.easy_button = self.screen.create_image(*self.button_pos["easy_button"],
-													image=GameView.resources["easy_button.png"], anchor="center")
-		self.button_pos["medium_button"] = (int(self.screen["width"]) // 2, 500)
-		self.medium_button = self.screen.create_image(*self.button_pos["medium_button"],
-													  image=GameView.resources["medium_button.png"], anchor="center")
-		self.button_pos["hard_button"] = (int(self.screen["width"]) // 2, 600)
-		self.hard_button = self.screen.create_image(*self.button_pos["hard_button"],
-													image=GameView.resources["hard_button.png"], anchor="center")
+		self.draw_screen("levels")
 
 	def draw_instructions(self):
 		"""Draws instructions for game."""
-		self.clear()
-		self.current_display = "instructions"
-		self.draw_background()
-		self.button_pos["main_menu_button"] = (150, 100)
-		self.main_menu_button = self.screen.create_image(*self.button_pos["main_menu_button"],
-														 image=GameView.resources["main_menu_button.png"],
-														 anchor="center")
-		self.instructions_page = self.screen.create_image(int(self.screen["width"]) // 2, 475,
-														  image=GameView.resources["instructions_page.png"],
-														  anchor="center")
+		self.draw_screen("instructions")
 
 	def draw_leaderboard(self):
 		"""Draws leaderboard display selection screen."""
-		self.clear()
-		self.current_display = "leaderboard"
-		self.draw_background()
-		self.button_pos["main_menu_button"] = (150, 100)
-		self.main_menu_button = self.screen.create_image(*self.button_pos["main_menu_button"],
-														 image=GameView.resources["main_menu_button.png"],
-														 anchor="center")
-		self.button_pos["easy_button"] = (int(self.screen["width"]) // 2, 400)
-		self.easy_button = self.screen.create_image(*self.button_pos["easy_button"],
-													image=GameView.resources["easy_button.png"], anchor="center")
-		self.button_pos["medium_button"] = (int(self.screen["width"]) // 2, 500)
-		self.medium_button = self.screen.create_image(*self.button_pos["medium_button"],
-													  image=GameView.resources["medium_button.png"], anchor="center")
-		self.button_pos["hard_button"] = (int(self.screen["width"]) // 2, 600)
-		self.hard_button = self.screen.create_image(*self.button_pos["hard_button"],
-													image=GameView.resources["hard_button.png"], anchor="center")
+		self.draw_screen("leaderboard")
 
 	def draw_scores(self, lb: List[dict]):
-		"""Draws top 10 scores from leaderboard."""
-		for i in range(10):
-			self.screen.create_text(100, i * 50 + 250, text=f"{i + 1}.", font="Helvetica 30", fill="white", anchor="e")
-			self.screen.create_text(130, i * 50 + 250, text=f"{lb[i]['username']}", font="Helvetica 30", fill="white",
-									anchor="w")
-			self.screen.create_text(int(self.screen["width"]) - 100, i * 50 + 250, text=f"{lb[i]['score']}",
-									font="Helvetica 30", fill="deep sky blue", anchor="e")
+		"""Draws a page of scores from leaderboard, or as many as it has."""
+		for i in range(min(self.page_size, len(lb))):
+			self.score_rows.append(self.draw_score_row(i, lb[i]))
+
+	def draw_score_row(self, i: int, entry: dict) -> Tuple[int, int, int]:
+		"""Draws the rank, username, and score of a leaderboard row and returns their items."""
+		return (
+			self.screen.create_text(100, i * 50 + 250, text=f"{self.first_rank + i}.", font="Helvetica 30",
+									fill="white", anchor="e"),
+			self.screen.create_text(130, i * 50 + 250, text=f"{entry['username']}", font="Helvetica 30", fill="white",
+									anchor="w"),
+			self.screen.create_text(int(self.screen["width"]) - 100, i * 50 + 250, text=f"{entry['score']}",
+									font="Helvetica 30", fill="deep sky blue", anchor="e"))
+
+	def patch_scores(self, lb: List[dict], rows: List[int]):
+		"""Redraws only the rows of the leaderboard being shown that changed.
+
+		Only the first page is patched, since changes are only pushed for the top of the leaderboard.
+		"""
+		if self.first_rank != 1:
+			return
+		self.page_entries = lb[:self.page_size]
+		for i in sorted(rows):
+			if i >= min(self.page_size, len(lb)):
+				break
+			if i < len(self.score_rows):
+				rank, username, score = self.score_rows[i]
+				self.screen.itemconfig(username, text=f"{lb[i]['username']}")
+				self.screen.itemconfig(score, text=f"{lb[i]['score']}")
+			else:
+				self.score_rows.append(self.draw_score_row(i, lb[i]))
+		while len(self.score_rows) > min(self.page_size, len(lb)):
+			self.screen.delete(*self.score_rows.pop())
+
+	def draw_leaderboard_page(self, lb_model: "LeaderboardModel", difficulty: str, entries: List[dict]):
+		"""Draws a page of a leaderboard, the buttons to move between pages, and the player's best score."""
+		self.draw_screen(f"{difficulty} leaderboard")
+		self.page_difficulty = difficulty
+		self.page_entries = entries[:self.page_size]
+		self.first_rank = len(self.page_cursors) * self.page_size + 1
+		self.draw_scores(self.page_entries)
+		if lb_model.pageable():  # Backends that keep only the leaderboard have no pages after the first
+			if self.page_cursors:
+				self.draw_button(PREVIOUS_PAGE_BUTTON)
+			if len(self.page_entries) == self.page_size:
+				self.draw_button(NEXT_PAGE_BUTTON)
+		self.draw_personal_best(lb_model)
+
+	def draw_personal_best(self, lb_model: "LeaderboardModel"):
+		"""Draws the player's best score on the leaderboard shown, or updates it once it has loaded."""
+		known, best = lb_model.personal_best(self.page_difficulty, self.username)
+		text = f"Your best: {'...' if not known else '-' if best is None else best['score']}"
+		if self.personal_best_text is None:
+			self.personal_best_text = self.screen.create_text(int(self.screen["width"]) - 100, 100, text=text,
+															  font="Helvetica 20", fill="white", anchor="e")
+		else:
+			self.screen.itemconfig(self.personal_best_text, text=text)
+
+	def draw_first_page(self, lb_model: "LeaderboardModel", difficulty: str):
+		"""Draws the top of a leaderboard, which is cached, unlike the pages after it."""
+		self.page_cursors = []
+		self.draw_leaderboard_page(lb_model, difficulty, lb_model.get(difficulty))
+
+	def draw_next_page(self, lb_model: "LeaderboardModel"):
+		"""Draws the page after the one shown, staying on it if there are no more scores."""
+		entries = lb_model.page(self.page_difficulty, self.page_entries[-1], self.page_size)
+		if entries:
+			self.page_cursors.append(self.page_entries[-1])
+			self.draw_leaderboard_page(lb_model, self.page_difficulty, entries)
+
+	def draw_previous_page(self, lb_model: "LeaderboardModel"):
+		"""Draws the page before the one shown."""
+		self.page_cursors.pop()
+		if self.page_cursors:
+			entries = lb_model.page(self.page_difficulty, self.page_cursors[-1], self.page_size)
+		else:
+			entries = lb_model.get(self.page_difficulty)
+		self.draw_leaderboard_page(lb_model, self.page_difficulty, entries)
 
 	def draw_easy_leaderboard(self, lb_model: "LeaderboardModel"):
 		"""Draws easy mode leaderboard screen."""
-		self.clear()
-		self.current_display = "easy leaderboard"
-		self.draw_background()
-		self.button_pos["leaderboard_button"] = (150, 100)
-		self.leaderboard_button = self.screen.create_image(*self.button_pos["leaderboard_button"],
-														   image=GameView.resources["leaderboard_button.png"],
-														   anchor="center")
-		lb = lb_model.get("easy")
-		self.draw_scores(lb)
+		self.draw_first_page(lb_model, "easy")
 
 	def draw_medium_leaderboard(self, lb_model: "LeaderboardModel"):
 		"""Draws medium mode leaderboard screen."""
-		self.clear()
-		self.current_display = "medium leaderboard"
-		self.draw_background()
-		self.button_pos["leaderboard_button"] = (150, 100)
-		self.leaderboard_button = self.screen.create_image(*self.button_pos["leaderboard_button"],
-														   image=GameView.resources["leaderboard_button.png"],
-														   anchor="center")
-		lb = lb_model.get("medium")
-		self.draw_scores(lb)
+		self.draw_first_page(lb_model, "medium")
 
 	def draw_hard_leaderboard(self, lb_model: "LeaderboardModel"):
 		"""Draws hard mode leaderboard screen."""
-		self.clear()
-		self.current_display = "hard leaderboard"
-		self.draw_background()
-		self.button_pos["leaderboard_button"] = (150, 100)
-		self.leaderboard_button = self.screen.create_image(*self.button_pos["leaderboard_button"],
-														   image=GameView.resources["leaderboard_button.png"],
-														   anchor="center")
-		lb = lb_model.get("hard")
-		self.draw_scores(lb)
+		self.draw_first_page(lb_model, "hard")
 
 	def draw_game_over(self, score: int):
 		"""Draws death screen."""
-		self.clear()
-		self.current_display = "game_over"
-		self.draw_background()
+		self.draw_screen("game_over")
 		self.final_score_display = self.screen.create_text(int(self.screen["width"]) // 2, 400,
 														   text=f"Final score: {score}", font="Helvetica 40",
 														   fill="white")
-		self.button_pos["main_menu_button"] = (int(self.screen["width"]) // 2, 500)
-		self.main_menu_button = self.screen.create_image(*self.button_pos["main_menu_button"],
-														 image=GameView.resources["main_menu_button.png"],
-														 anchor="center")
+
+
+class ViewPool:
+	"""Recycles ObjectViews, keeping their canvas items hidden while they are unused."""
+
+	def __init__(self, screen: "tk.Canvas"):
+		"""Inits ViewPool."""
+		self.screen = screen
+		self.free = {}  # Maps ObjectView types to unused ObjectViews of that type
+
+	def acquire(self, view_type: type) -> "ObjectView":
+		"""Returns a recycled or new ObjectView of a type."""
+		free = self.free.get(view_type)
+		if free:
+			view = free.pop()
+			view.set_visible(True)
+			return view
+		return view_type(self.screen)
+
+	def release(self, view: "ObjectView"):
+		"""Hides an ObjectView that is no longer used and returns it to the pool."""
+		view.set_visible(False)
+		self.free.setdefault(type(view), []).append(view)
 
 
 class ObjectView(metaclass=ABCMeta):
-	"""Contains all objects with views."""
+	"""Contains all objects with views.
+
+	Views are retained: canvas items are created on the first draw and moved or reconfigured on later draws.
+	"""
 
 	def __init__(self, screen: "Canvas"):
 		"""Inits ObjectView"""
@@ -265,82 +540,182 @@ class ObjectView(metaclass=ABCMeta):
 	def delete(self):
 		"""Deletes all components of itself."""
 		self.screen.delete(*self.components)
+		self.components = []  # Next draw recreates the canvas items
+
+	def set_visible(self, visible: bool):
+		"""Shows or hides all components of itself."""
+		for component in self.components:
+			self.screen.itemconfig(component, state="normal" if visible else "hidden")
+
+	def draw(self, model: "ObjectModel", alpha: float = 1.0):
+		"""Draws view from model, creating its canvas items if they do not exist yet."""
+		if self.components:
+			self.redraw(model, alpha)
+		else:
+			self.components = self.create(model, alpha)
 
 	@abstractmethod
-	def draw(self, model: "ObjectModel"):
-		"""Draws view from model."""
+	def create(self, model: "ObjectModel", alpha: float) -> List[int]:
+		"""Creates canvas items from model and returns their ids."""
+		pass
+
+	@abstractmethod
+	def redraw(self, model: "ObjectModel", alpha: float):
+		"""Moves or reconfigures existing canvas items from model."""
 		pass
 
 
 class SpaceshipView(ObjectView):
 	"""View for spaceship."""
 
-	def draw(self, model: "SpaceshipModel"):
-		"""Draws spaceship."""
-		self.components = [
-			self.screen.create_image(model.x + 3, model.y - 5, image=GameView.resources["spaceship.png"],
-									 anchor="center"),
-			self.screen.create_oval(model.x - model.r, model.y - model.r, model.x + model.r, model.y + model.r, fill="",
-									outline="white")]
+	def create(self, model: "SpaceshipModel", alpha: float) -> List[int]:
+		"""Creates spaceship image and hitbox."""
+		x, y = model.interpolate_pos(alpha)
+		return [
+			self.screen.create_image(x + 3, y - 5, image=GameView.resources["spaceship.png"], anchor="center"),
+			self.screen.create_oval(x - model.r, y - model.r, x + model.r, y + model.r, fill="", outline="white")]
+
+	def redraw(self, model: "SpaceshipModel", alpha: float):
+		"""Moves spaceship image and hitbox."""
+		x, y = model.interpolate_pos(alpha)
+		image, hitbox = self.components
+		self.screen.coords(image, x + 3, y - 5)
+		self.screen.coords(hitbox, x - model.r, y - model.r, x + model.r, y + model.r)
 
 
 class SpaceshipStatsView(ObjectView):
-	"""View for spaceship stats."""
+	"""View for spaceship stats.
 
-	def draw(self, model: "SpaceshipModel"):
-		"""Draws hp, fuel bar, and score."""
-		self.components = [
+	Remembers the stats it last drew, so a frame only updates the items whose values changed.
+	"""
+	resources = ("heart.gif",)  # Resources drawn on their own rather than from the sprite atlas
+
+	def __init__(self, screen: "Canvas"):
+		"""Inits SpaceshipStatsView."""
+		super().__init__(screen)
+		self.score_text = None
+		self.fuel_bar = None
+		self.max_text = None
+		self.hearts = []
+		self.score = None  # Stats currently shown
+		self.fuel = None
+
+	def create(self, model: "SpaceshipModel", alpha: float) -> List[int]:
+		"""Creates static HUD pieces once, then the hp, fuel bar, and score."""
+		components = [
 			self.screen.create_line(0, 800, int(self.screen["width"]), 800, fill="white", width=10),
 			self.screen.create_text(10, 810, text="HP: ", font="Helvetica 20", fill="white", anchor="nw"),
 			self.screen.create_text(10, 853, text="Fuel: ", font="Helvetica 20", fill="white", anchor="nw"),
-			self.screen.create_text(790, 810, text="Score", font="Helvetica 20", fill="white", anchor="ne"),
-			self.screen.create_text(790, 853, text=f"{model.score}", font="Helvetica 20", fill="deep sky blue",
-									anchor="ne"),
-			self.screen.create_rectangle(80, 860, 280, 880, fill="white", outline="white"),
-			self.screen.create_rectangle(80, 860, 80 + 200 * model.fuel / 100, 880, fill="yellow", outline="white")]
-		for i in range(model.hp):
-			self.components.append(
-				self.screen.create_image(i * 30 + 60, 813, image=GameView.resources["heart.gif"], anchor="nw"))
-
-		if model.hp == 9:
-			self.components.append(self.screen.create_text(330, 840, text="(Max)", font="Helvetica 10", fill="white", anchor="w"))
+			self.screen.create_text(790, 810, text="Score", font="Helvetica 20", fill="white", anchor="ne")]
+		self.score_text = self.screen.create_text(790, 853, text=f"{model.score}", font="Helvetica 20",
+												  fill="deep sky blue", anchor="ne")
+		components.append(self.score_text)
+		components.append(self.screen.create_rectangle(80, 860, 280, 880, fill="white", outline="white"))
+		self.fuel_bar = self.screen.create_rectangle(80, 860, 80 + 200 * model.fuel / 100, 880, fill="yellow",
+													 outline="white")
+		components.append(self.fuel_bar)
+		self.max_text = self.screen.create_text(330, 840, text="(Max)", font="Helvetica 10", fill="white", anchor="w",
+												state="normal" if model.hp == 9 else "hidden")
+		components.append(self.max_text)
+		self.hearts = []
+		self.set_hearts(model.hp, components)
+		self.score = model.score
+		self.fuel = model.fuel
+		return components
+
+	def redraw(self, model: "SpaceshipModel", alpha: float):
+		"""Updates the score, fuel bar, and hp that changed since the last frame."""
+		if model.score != self.score:
+			self.score = model.score
+			self.screen.itemconfig(self.score_text, text=f"{model.score}")
+		if model.fuel != self.fuel:
+			self.fuel = model.fuel
+			self.screen.coords(self.fuel_bar, 80, 860, 80 + 200 * model.fuel / 100, 880)
+		if len(self.hearts) != max(model.hp, 0):
+			self.set_hearts(model.hp, self.components)
+			self.screen.itemconfig(self.max_text, state="normal" if model.hp == 9 else "hidden")
+
+	def set_hearts(self, hp: int, components: List[int]):
+		"""Adds or removes heart images until there is one per hp."""
+		while len(self.hearts) < hp:
+			heart = self.screen.create_image(len(self.hearts) * 30 + 60, 813, image=GameView.resources["heart.gif"],
+											 anchor="nw")
+			self.hearts.append(heart)
+			components.append(heart)
+		while len(self.hearts) > max(hp, 0):
+			heart = self.hearts.pop()
+			components.remove(heart)
+			self.screen.delete(heart)
 
 
 class AsteroidView(ObjectView):
 	"""View for asteroid."""
 
-	def draw(self, model: "AsteroidModel"):
-		"""Draws asteroid."""
-		self.components = [
-			self.screen.create_oval(model.x - model.r, model.y - model.r, model.x + model.r, model.y + model.r,
-									fill="grey")]
+	def create(self, model: "AsteroidModel", alpha: float) -> List[int]:
+		"""Creates asteroid."""
+		x, y = model.interpolate_pos(alpha)
+		return [self.screen.create_oval(x - model.r, y - model.r, x + model.r, y + model.r, fill="grey")]
+
+	def redraw(self, model: "AsteroidModel", alpha: float):
+		"""Moves and resizes asteroid."""
+		x, y = model.interpolate_pos(alpha)
+		self.screen.coords(self.components[0], x - model.r, y - model.r, x + model.r, y + model.r)
+
+
+class PowerUpView(ObjectView):
+	"""Contains all power-up views, which draw an icon inside a bubble as one sprite."""
+	sprite = None  # Name of the sprite in GameView.sprites
+
+	def create(self, model: "Driftable", alpha: float) -> List[int]:
+		"""Creates power-up."""
+		x, y = model.interpolate_pos(alpha)
+		return [self.screen.create_image(x, y, image=GameView.sprites[self.sprite], anchor="center")]
+
+	def redraw(self, model: "Driftable", alpha: float):
+		"""Moves power-up."""
+		x, y = model.interpolate_pos(alpha)
+		self.screen.coords(self.components[0], x, y)
+
+
+class HpPowerUpView(PowerUpView):
+	"""View for HP power-up, a heart in a bubble."""
+	sprite = "hp_powerup"
+
 
+class FuelPowerUpView(PowerUpView):
+	"""View for fuel power-up, a lightning bolt in a bubble."""
+	sprite = "fuel_powerup"
 
-class HpPowerUpView(ObjectView):
-	"""View for HP power-up."""
 
-	def draw(self, model: "HpPowerUpModel"):
-		"""Draws heart and bubble."""
-		self.components = [
-			self.screen.create_image(model.x, model.y, image=GameView.resources["heart.gif"], anchor="center"),
-			self.screen.create_image(model.x, model.y, image=GameView.resources["bubble.png"], anchor="center")]
+class ScorePowerUpView(PowerUpView):
+	"""View for score power-up, a fish in a bubble."""
+	sprite = "score_powerup"
 
 
-class FuelPowerUpView(ObjectView):
-	"""View for fuel power-up."""
+class ProfilerView(ObjectView):
+	"""Overlay next to the spaceship stats showing frames per second and percentiles of each phase of a frame."""
 
-	def draw(self, model: "FuelPowerUpModel"):
-		"""Draws lightning bolt and bubble."""
-		self.components = [
-			self.screen.create_image(model.x, model.y, image=GameView.resources["lightning.png"], anchor="center"),
-			self.screen.create_image(model.x, model.y, image=GameView.resources["bubble.png"], anchor="center")]
+	def __init__(self, screen: "Canvas", refresh_frames: int = 15):
+		"""Inits ProfilerView, which rewrites its text every refresh_frames frames."""
+		super().__init__(screen)
+		self.refresh_frames = refresh_frames
+		self.frames = 0
 
+	@staticmethod
+	def text(profiler: "FrameProfiler") -> str:
+		"""Returns frames per second and the p50/p95/p99 of each phase in milliseconds."""
+		lines = [f"FPS {profiler.fps():.0f}   canvas ops {profiler.canvas_operations():.0f}   p50 / p95 / p99 ms"]
+		for phase, (p50, p95, p99) in profiler.summary().items():
+			lines.append(f"{phase:<8}{p50 * 1000:6.2f} {p95 * 1000:6.2f} {p99 * 1000:6.2f}")
+		return "\n".join(lines)
 
-class ScorePowerUpView(ObjectView):
-	"""View for score power-up."""
+	def create(self, model: "FrameProfiler", alpha: float) -> List[int]:
+		"""Creates the overlay text."""
+		return [self.screen.create_text(400, 806, text=self.text(model), font="Courier 8", fill="light green",
+										anchor="nw")]
 
-	def draw(self, model: "ScorePowerUpModel"):
-		"""Draws fish and bubble."""
-		self.components = [
-			self.screen.create_image(model.x, model.y, image=GameView.resources["fish.png"], anchor="center"),
-			self.screen.create_image(model.x, model.y, image=GameView.resources["bubble.png"], anchor="center")]
+	def redraw(self, model: "FrameProfiler", alpha: float):
+		"""Updates the overlay text every refresh_frames frames."""
+		self.frames += 1
+		if self.frames % self.refresh_frames == 0:
+			self.screen.itemconfig(self.components[0], text=self.text(model))